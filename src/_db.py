@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Read-only connections to the Mail database
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+# Mail database path
+MAIL_DB_PATH = Path.home() / "Library/Mail/V10/MailData/Envelope Index"
+
+# One connection per thread, opened on first use and kept for the
+# thread's lifetime. MCP tool handlers run on a pool of worker threads,
+# so lookups from different threads never wait on each other.
+_local = threading.local()
+
+# MAIL_DB_IMMUTABLE=1 opens the database with immutable=1: SQLite takes no
+# locks and never opens the -wal/-shm files. It then also ignores the WAL,
+# so mail not yet checkpointed by Mail.app stays invisible, and connections
+# must be reopened (reset_connections) to see any change at all.
+IMMUTABLE = os.environ.get('MAIL_DB_IMMUTABLE', '') == '1'
+
+# Bumped by reset_connections(); connections from an older generation
+# are reopened on next use
+_generation = 0
+
+
+def _connect():
+    """
+    Open a read-only connection to the Mail database
+
+    Mail.app keeps writing to the database while we read it, so by
+    default it is opened with mode=ro rather than immutable=1: SQLite
+    still takes shared locks and sees new mail.
+
+    Returns:
+        sqlite3.Connection: Connection opened in read-only mode
+
+    Raises:
+        FileNotFoundError: If the Mail database does not exist
+    """
+    if not MAIL_DB_PATH.exists():
+        raise FileNotFoundError(f"Mail database not found: {MAIL_DB_PATH}")
+
+    conn = sqlite3.connect(
+        f"{MAIL_DB_PATH.as_uri()}?mode=ro{'&immutable=1' if IMMUTABLE else ''}",
+        uri=True,
+        cached_statements=256
+    )
+    conn.execute("PRAGMA query_only = 1")
+    # Page cache is per connection, so keep each one moderate (20 MiB)
+    conn.execute("PRAGMA cache_size = -20000")
+    conn.execute("PRAGMA mmap_size = 1073741824")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def get_conn():
+    """
+    Get this thread's read-only connection to the Mail database
+
+    Returns:
+        sqlite3.Connection: Connection opened in read-only mode
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.generation != _generation:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = _connect()
+        _local.conn = conn
+        _local.generation = _generation
+    return conn
+
+
+def reset_connections():
+    """
+    Reopen every thread's connection on its next use
+
+    Only needed with MAIL_DB_IMMUTABLE=1, where an open connection never
+    sees changes Mail.app makes to the database.
+    """
+    global _generation
+    _generation += 1
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for Mail database lookups
+"""
+
+
+def normalize_message_id(message_id: str) -> str:
+    """
+    Normalize a Message-ID to the form stored in the Mail database
+
+    Strips surrounding whitespace (e.g. a trailing newline copied along
+    with the ID) and adds angle brackets if missing, so every lookup and
+    cache uses the same key for the same email.
+
+    Args:
+        message_id: RFC Message-ID, with or without angle brackets
+
+    Returns:
+        str: Message-ID including angle brackets, e.g. <abc@example.com>
+    """
+    message_id = message_id.strip()
+    return message_id if message_id.startswith('<') else f'<{message_id}>'
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for reading .emlx email files
+"""
+
+import mmap
+import os
+
+# Files at least this large are memory-mapped instead of read; for
+# typical emails a single read() is cheaper than setting up a mapping
+_MMAP_THRESHOLD = 1024 * 1024
+
+# Start of the Apple plist metadata that follows the raw email
+_PLIST_MARKERS = (b'\n<?xml version', b'\n<!DOCTYPE plist', b'\n<plist version')
+
+
+def read_emlx_body(file_path) -> bytes:
+    """
+    Read the raw RFC 822 message from an .emlx file
+
+    .emlx file format:
+    First line: file size
+    Second line onwards: raw email content
+    Last few lines: Apple plist metadata (XML)
+
+    The email is cut out using the byte count on the first line (the
+    plist markers are searched only if it is malformed). Large files are
+    memory-mapped so that only the email itself is copied into memory.
+
+    Args:
+        file_path: Path to .emlx file
+
+    Returns:
+        bytes: Raw email content without the size line and plist
+
+    Raises:
+        ValueError: If the file is empty or has no content after the size line
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _MMAP_THRESHOLD:
+            return _slice_email(f.read())
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _slice_email(mm)
+
+
+def _slice_email(data) -> bytes:
+    """
+    Cut the raw email out of .emlx content
+
+    Args:
+        data: Whole file content (bytes or mmap)
+
+    Returns:
+        bytes: The email: as many bytes after the size line as it
+               states, or everything up to the plist metadata
+
+    Raises:
+        ValueError: If there is no content after the size line
+    """
+    first_nl = data.find(b'\n')
+    if first_nl == -1 or first_nl == len(data) - 1:
+        raise ValueError("Invalid file format or empty file")
+
+    # The first line is the byte length of the email
+    start = first_nl + 1
+    try:
+        length = int(data[:first_nl])
+    except ValueError:
+        length = 0
+    if 0 < length <= len(data) - start:
+        return data[start:start + length]
+
+    # Malformed length: cut at the start of the plist instead
+    end = len(data)
+    for marker in _PLIST_MARKERS:
+        pos = data.find(marker, first_nl, end)
+        if pos != -1:
+            # Keep the newline that ends the last email line
+            end = pos + 1
+
+    return data[start:end]
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Email parsing backends used by parse_email_file
+
+The stdlib `email` package is the default. Setting MAIL_PARSER_BACKEND=fast
+switches to fast-mail-parser (Rust `mailparse` bindings) when it is
+installed; emails it cannot parse fall back to the stdlib.
+"""
+
+import codecs
+import email
+import email.parser
+import email.policy
+import functools
+import os
+import sys
+from typing import Dict, Any
+
+# Optional: Rust-backed MIME parser, several times faster on large emails
+try:
+    import fast_mail_parser
+except ImportError:
+    fast_mail_parser = None
+
+
+# Stops MIME parsing after the header block
+_header_parser = email.parser.BytesHeaderParser(policy=email.policy.default)
+
+
+# Codecs that bytes.decode() handles in C without a registry lookup
+_NATIVE_CODECS = frozenset({'utf-8', 'ascii', 'iso8859-1'})
+
+
+@functools.lru_cache(maxsize=256)
+def _decoder(charset: str):
+    """
+    Resolve a charset to its decode function once
+
+    Args:
+        charset: Charset name from a Content-Type header
+
+    Returns:
+        Decode function of the codec, or None for codecs bytes.decode()
+        already resolves natively
+
+    Raises:
+        LookupError: If the charset is unknown
+    """
+    info = codecs.lookup(charset)
+    return None if info.name in _NATIVE_CODECS else info.decode
+
+
+def _decode(payload: bytes, charset: str, errors: str = 'strict') -> str:
+    """
+    Decode a payload like payload.decode(charset, errors), reusing the codec
+
+    Args:
+        payload: Decoded transfer payload
+        charset: Charset name from a Content-Type header
+        errors: Codec error handler
+
+    Returns:
+        str: Decoded text
+
+    Raises:
+        LookupError: If the charset is unknown
+        UnicodeDecodeError: If errors is 'strict' and the payload is invalid
+    """
+    decode = _decoder(charset)
+    if decode is None:
+        return payload.decode(charset, errors)
+    return decode(payload, errors)[0]
+
+
+def _encoded_size(part) -> int:
+    """
+    Size of a part's decoded payload, computed without decoding base64
+
+    Args:
+        part: Non-multipart email.message.EmailMessage
+
+    Returns:
+        int: Decoded size in bytes (exact for well-formed base64)
+    """
+    payload = part.get_payload()
+    if not isinstance(payload, str):
+        return 0
+
+    cte = str(part.get('Content-Transfer-Encoding', '')).strip().lower()
+
+    if cte == 'base64':
+        # 4 encoded characters carry 3 bytes; '=' padding carries none
+        data_len = len(payload) - sum(payload.count(c) for c in '\r\n\t ')
+        tail = payload.rstrip()
+        padding = len(tail) - len(tail.rstrip('='))
+        return max(data_len * 3 // 4 - padding, 0)
+
+    if cte == 'quoted-printable':
+        # Escapes make the ratio unpredictable; decode (rare for attachments)
+        decoded = part.get_payload(decode=True)
+        return len(decoded) if decoded else 0
+
+    # 7bit / 8bit / binary are stored as-is
+    return len(payload)
+
+
+def _extract_body(msg) -> str:
+    """
+    Decode the plain text body of a parsed email
+
+    Args:
+        msg: email.message.EmailMessage parsed with the default policy
+
+    Returns:
+        str: First text/plain part that is not an attachment, or the
+             decoded body of a single-part text email ("" if none)
+    """
+    body_text = ""
+    body_part = msg.get_body(preferencelist=('plain',))
+
+    if body_part is not None:
+        payload = body_part.get_payload(decode=True)
+        if payload:
+            charset = body_part.get_content_charset() or 'utf-8'
+            try:
+                body_text = _decode(payload, charset)
+            except (UnicodeDecodeError, LookupError):
+                # Fallback to utf-8
+                body_text = payload.decode('utf-8', errors='replace')
+    elif msg.get_content_maintype() == 'text':
+        # Single-part text/html etc.: decode it rather than str(get_payload()),
+        # which returns the still-encoded source (or re-serializes subparts).
+        # Non-text bodies are attachments and intentionally left out.
+        payload = msg.get_payload(decode=True)
+        if isinstance(payload, (bytes, bytearray)):
+            try:
+                body_text = _decode(payload, msg.get_content_charset() or 'utf-8', 'replace')
+            except LookupError:
+                body_text = payload.decode('utf-8', errors='replace')
+
+    return body_text
+
+
+def _header(msg, name: str) -> str:
+    """
+    Read a header as a string, tolerating values the default policy cannot parse
+
+    Some malformed headers (e.g. "Message-Id: <<<>>" or "From: a@") make the
+    default policy's header parser raise instead of registering a defect.
+    Those fall back to the raw value, as the compat32 policy returned it.
+
+    Args:
+        msg: Parsed email.message.EmailMessage
+        name: Header name
+
+    Returns:
+        str: Header value, or "" if the header is missing
+    """
+    try:
+        return str(msg.get(name, ''))
+    except (LookupError, UnicodeDecodeError):
+        # IndexError from the header value parser is a LookupError
+        for key, value in msg.raw_items():
+            if key.lower() == name.lower():
+                # Unfold continuation lines
+                return ''.join(value.splitlines()).strip()
+        return ''
+
+
+def _parse_stdlib(raw_content: bytes, headers_only: bool = False) -> Dict[str, Any]:
+    """
+    Parse raw email bytes with the stdlib email package
+
+    Args:
+        raw_content: Raw RFC 822 email
+        headers_only: Skip body extraction
+
+    Returns:
+        Dictionary with header fields, unprocessed body_text and attachments
+    """
+    # Parse email - the default policy decodes RFC 2047 headers and filenames
+    msg = None
+    if headers_only:
+        # Header block only; the body is kept as one unparsed string.
+        # Enough unless the MIME tree must be walked for attachments.
+        msg = _header_parser.parsebytes(raw_content)
+        if msg.get_content_maintype() == 'multipart':
+            msg = None
+
+    if msg is None:
+        msg = email.message_from_bytes(raw_content, policy=email.policy.default)
+
+    # Extract attachments metadata
+    attachments = []
+
+    if msg.is_multipart():
+        # walk() rather than iter_attachments(), which only looks at
+        # top-level parts and misses attachments nested in alternatives
+        for part in msg.walk():
+            content_type = part.get_content_type()
+
+            # Check for attachment
+            # An attachment can be identified by:
+            # 1. Content-Disposition type is 'attachment'
+            # 2. Has a filename but is NOT a text/plain or text/html part
+            is_attachment = (
+                part.get_content_disposition() == 'attachment' or
+                (part.get_filename() and content_type not in ['text/plain', 'text/html'])
+            )
+
+            if is_attachment:
+                # Extract attachment metadata
+                filename = part.get_filename()
+
+                if filename:
+                    attachments.append({
+                        "filename": filename,
+                        "mime_type": content_type,
+                        # Sized from the encoded payload; decoding a large
+                        # attachment just to measure it costs its full size
+                        "size_bytes": _encoded_size(part)
+                    })
+
+    body_text = "" if headers_only else _extract_body(msg)
+
+    return {
+        "message_id": _header(msg, 'Message-Id'),
+        "subject": _header(msg, 'Subject'),
+        "from": _header(msg, 'From'),
+        "to": _header(msg, 'To'),
+        "cc": _header(msg, 'Cc'),
+        "date": _header(msg, 'Date'),
+        # Threading-related headers (important for conversation analysis)
+        "references": _header(msg, 'References'),
+        "in_reply_to": _header(msg, 'In-Reply-To'),
+        "body_text": body_text,
+        "attachments": attachments
+    }
+
+
+def _parse_fast(raw_content: bytes, headers_only: bool = False) -> Dict[str, Any]:
+    """
+    Parse raw email bytes with fast-mail-parser
+
+    Args:
+        raw_content: Raw RFC 822 email
+        headers_only: Leave body_text empty
+
+    Returns:
+        Same structure as _parse_stdlib
+    """
+    mail = fast_mail_parser.parse_email(raw_content)
+
+    # Header names keep the sender's capitalization and each value is a
+    # list with one entry per occurrence; keep the first, like msg.get()
+    headers = {
+        name.lower(): values[0] if isinstance(values, list) else values
+        for name, values in mail.headers.items()
+        if values
+    }
+
+    return {
+        "message_id": headers.get('message-id', ''),
+        "subject": mail.subject or headers.get('subject', ''),
+        "from": headers.get('from', ''),
+        "to": headers.get('to', ''),
+        "cc": headers.get('cc', ''),
+        "date": headers.get('date', ''),
+        "references": headers.get('references', ''),
+        "in_reply_to": headers.get('in-reply-to', ''),
+        # mailparse keeps CRLF line endings; match the stdlib output
+        "body_text": (
+            mail.text_plain[0].replace('\r\n', '\n')
+            if mail.text_plain and not headers_only else ""
+        ),
+        "attachments": [
+            {
+                "filename": att.filename,
+                "mime_type": att.mimetype,
+                "size_bytes": len(att.content)
+            }
+            for att in mail.attachments
+            if att.filename
+        ]
+    }
+
+
+def _use_fast_backend() -> bool:
+    """Whether MAIL_PARSER_BACKEND selects fast-mail-parser and it is available"""
+    if os.environ.get('MAIL_PARSER_BACKEND', 'stdlib') != 'fast':
+        return False
+    if fast_mail_parser is None:
+        print("Warning: MAIL_PARSER_BACKEND=fast but fast-mail-parser is not installed, "
+              "using the stdlib parser", file=sys.stderr)
+        return False
+    return True
+
+
+# Resolved once at import; the environment is fixed for the server's lifetime
+USE_FAST_BACKEND = _use_fast_backend()
+
+# Whether a fast-mail-parser failure has been reported on stderr
+_fast_failure_warned = False
+
+
+def parse_bytes(raw_content: bytes, headers_only: bool = False) -> Dict[str, Any]:
+    """
+    Parse raw email bytes with the configured backend
+
+    Args:
+        raw_content: Raw RFC 822 email (without .emlx size line and plist)
+        headers_only: Skip body extraction (body_text is "")
+
+    Returns:
+        Dictionary containing:
+        {
+            "message_id": "...",
+            "subject": "...",
+            "from": "...",
+            "to": "...",
+            "cc": "...",
+            "date": "...",
+            "references": "...",
+            "in_reply_to": "...",
+            "body_text": "first text/plain part, not stripped or truncated",
+            "attachments": [{"filename": "...", "mime_type": "...", "size_bytes": 123}]
+        }
+    """
+    global _fast_failure_warned
+
+    if USE_FAST_BACKEND:
+        try:
+            return _parse_fast(raw_content, headers_only)
+        except (fast_mail_parser.ParseError, TypeError, ValueError) as e:
+            # Malformed for mailparse - the stdlib parser is more lenient
+            if not _fast_failure_warned:
+                _fast_failure_warned = True
+                print(f"Warning: fast-mail-parser failed ({e}), "
+                      f"falling back to the stdlib parser", file=sys.stderr)
+
+    return _parse_stdlib(raw_content, headers_only)
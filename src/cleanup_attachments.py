@@ -6,8 +6,12 @@ Provides functionality to remove attachment directories for specific messages
 """
 
 import os
-from pathlib import Path
-from typing import Dict, List, Any
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+# Maximum number of message directories removed in parallel
+CLEANUP_WORKERS = 8
 
 
 def get_attachment_base_dir() -> str:
@@ -24,13 +28,96 @@ def get_attachment_base_dir() -> str:
     return os.path.join(base_temp, 'mail-mcp-attachments')
 
 
-def cleanup_attachments(message_ids: List[str], base_dir: str = None) -> Dict[str, Any]:
+def _dir_size(path: str) -> Tuple[int, int]:
+    """
+    Total size and number of files under a directory
+
+    Uses os.scandir so file types come from the directory listing and
+    each file costs a single stat call.
+
+    Args:
+        path: Directory to measure
+
+    Returns:
+        Tuple of (total size in bytes, file count)
+    """
+    total_size = 0
+    file_count = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    total_size += entry.stat().st_size
+                    file_count += 1
+    return total_size, file_count
+
+
+def _dir_name(message_id: str) -> str:
+    """Directory name of a message: its Message-ID without angle brackets"""
+    return message_id.strip('<>')
+
+
+class CleanupError(Exception):
+    """Raised when an attachment directory cannot be removed"""
+
+
+def _cleanup_one(base_dir: str, message_id: str, compute_stats: bool) -> Optional[Dict[str, Any]]:
+    """
+    Remove the attachment directory of one message
+
+    Args:
+        base_dir: Base attachment directory
+        message_id: RFC Message-ID
+        compute_stats: Count files and bytes before removing
+
+    Returns:
+        Cleanup entry for the result, or None if the directory does not exist
+
+    Raises:
+        CleanupError: If the directory could not be removed
+    """
+    message_dir = os.path.join(base_dir, _dir_name(message_id))
+
+    if not os.path.isdir(message_dir):
+        return None
+
+    # Calculate size before deletion (one stat per file, so only on request)
+    total_size = file_count = None
+    if compute_stats:
+        total_size, file_count = _dir_size(message_dir)
+
+    # Remove directory
+    try:
+        shutil.rmtree(message_dir)
+    except FileNotFoundError:
+        # Removed by someone else since the isdir() check
+        return None
+    except Exception as e:
+        raise CleanupError(f"Failed to remove {message_dir}: {str(e)}") from e
+
+    return {
+        "message_id": message_id,
+        "path": message_dir,
+        "files_removed": file_count,
+        "size_freed": total_size
+    }
+
+
+def cleanup_attachments(
+    message_ids: List[str],
+    base_dir: str = None,
+    compute_stats: bool = False
+) -> Dict[str, Any]:
     """
     Remove attachment directories for specified message IDs
 
     Args:
         message_ids: List of RFC Message-IDs to clean up
         base_dir: Optional override for base directory
+        compute_stats: Report files_removed and size_freed (None otherwise)
 
     Returns:
         Dictionary containing:
@@ -46,13 +133,13 @@ def cleanup_attachments(message_ids: List[str], base_dir: str = None) -> Dict[st
                 }
             ],
             "not_found": ["..."],
-            "error": "..." (if failed)
+            "error": "..." (if any directory could not be removed;
+                            cleaned/not_found still list the others)
         }
     """
     base_dir = base_dir or get_attachment_base_dir()
-    base_path = Path(base_dir)
 
-    if not base_path.exists():
+    if not os.path.exists(base_dir):
         return {
             "success": True,
             "base_dir": base_dir,
@@ -63,41 +150,53 @@ def cleanup_attachments(message_ids: List[str], base_dir: str = None) -> Dict[st
 
     cleaned = []
     not_found = []
+    error = None
 
+    # IDs with and without angle brackets share a directory; remove each
+    # directory once (later duplicates are reported as not found, as if
+    # they had been processed one after another)
+    first_ids = {}
     for message_id in message_ids:
-        # Clean message_id for use as directory name (remove angle brackets)
-        clean_message_id = message_id.strip('<>')
-        message_dir = base_path / clean_message_id
-
-        if message_dir.exists() and message_dir.is_dir():
-            # Calculate size before deletion
-            total_size = 0
-            file_count = 0
-            for item in message_dir.rglob('*'):
-                if item.is_file():
-                    total_size += item.stat().st_size
-                    file_count += 1
+        first_ids.setdefault(_dir_name(message_id), message_id)
+
+    # Directories are independent, so stat/unlink work for several
+    # messages can overlap (the GIL is released during filesystem calls)
+    workers = min(CLEANUP_WORKERS, len(first_ids)) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            name: pool.submit(_cleanup_one, base_dir, message_id, compute_stats)
+            for name, message_id in first_ids.items()
+        }
 
-            # Remove directory
-            try:
-                import shutil
-                shutil.rmtree(message_dir)
-
-                cleaned.append({
-                    "message_id": message_id,
-                    "path": str(message_dir),
-                    "files_removed": file_count,
-                    "size_freed": total_size
-                })
-            except Exception as e:
-                return {
-                    "success": False,
-                    "base_dir": base_dir,
-                    "error": f"Failed to remove {message_dir}: {str(e)}"
-                }
+    # Every removal has finished; report each one, even after a failure
+    reported = set()
+    for message_id in message_ids:
+        name = _dir_name(message_id)
+        if name in reported:
+            not_found.append(message_id)
+            continue
+        reported.add(name)
+
+        try:
+            entry = futures[name].result()
+        except CleanupError as e:
+            error = error or str(e)
+            continue
+
+        if entry:
+            cleaned.append(entry)
         else:
             not_found.append(message_id)
 
+    if error:
+        return {
+            "success": False,
+            "base_dir": base_dir,
+            "cleaned": cleaned,
+            "not_found": not_found,
+            "error": error
+        }
+
     return {
         "success": True,
         "base_dir": base_dir,
@@ -122,7 +221,7 @@ def main():
 
     print(f"Cleaning up attachments for {len(message_ids)} message(s)...\n")
 
-    result = cleanup_attachments(message_ids)
+    result = cleanup_attachments(message_ids, compute_stats=True)
 
     if result['success']:
         print(f"✅ Cleanup successful\n")
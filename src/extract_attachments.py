@@ -7,54 +7,71 @@ Supports extracting specific attachments from emails for AI analysis
 
 import email
 import email.policy
-from email.header import decode_header
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import os
 import shutil
+import sys
 
+sys.path.insert(0, str(Path(__file__).parent))
+from _mime_utils import read_emlx_body
+from cleanup_attachments import get_attachment_base_dir
 
-def decode_header_value(value: str) -> str:
+
+def _index_mail_attachments(file_path_obj: Path) -> Dict[str, Path]:
     """
-    Decode encoded email header values (e.g. =?utf-8?B?...?=)
+    List the attachment files Mail saved to disk for an email
+
+    Mail keeps downloaded attachments next to the message store:
+    .../Data/{X}/{Y}/{Z}/Messages/{number}.partial.emlx
+    .../Data/{X}/{Y}/{Z}/Attachments/{number}/{attachment_id}/{filename}
 
     Args:
-        value: Encoded header value
+        file_path_obj: Path to the .emlx file
 
     Returns:
-        Decoded string
+        Dictionary mapping file name to its path (empty if none are saved)
     """
-    if not value:
-        return ""
-
-    decoded_parts = []
-    for content, encoding in decode_header(value):
-        if isinstance(content, bytes):
-            if encoding:
-                try:
-                    decoded_parts.append(content.decode(encoding))
-                except (LookupError, UnicodeDecodeError):
-                    decoded_parts.append(content.decode('utf-8', errors='replace'))
-            else:
-                decoded_parts.append(content.decode('utf-8', errors='replace'))
-        else:
-            decoded_parts.append(str(content))
+    message_num = file_path_obj.name.split('.', 1)[0]
+    message_att_dir = file_path_obj.parent.parent / "Attachments" / message_num
 
-    return ''.join(decoded_parts)
-
-
-def get_attachment_base_dir() -> str:
+    index = {}
+    try:
+        with os.scandir(message_att_dir) as att_dirs:
+            for att_dir in att_dirs:
+                if not att_dir.is_dir():
+                    continue
+                with os.scandir(att_dir.path) as entries:
+                    for entry in entries:
+                        # First attachment directory wins, like the old nested search
+                        if entry.name not in index and entry.is_file():
+                            index[entry.name] = Path(entry.path)
+    except OSError:
+        pass
+
+    return index
+
+
+def _write_attachment(output_path: str, source: Union[bytes, Path]) -> int:
     """
-    Get the base directory for saving attachments
+    Write an attachment to disk
 
-    Reads from MAIL_ATTACHMENT_PATH environment variable (defaults to /tmp),
-    then appends 'mail-mcp-attachments' subdirectory.
+    Args:
+        output_path: Destination file
+        source: Decoded MIME payload, or a file Mail saved to disk. Files
+                are copied with shutil.copyfile, which uses the kernel's
+                copy (sendfile/fcopyfile) instead of reading into Python
 
     Returns:
-        Full directory path (e.g., /tmp/mail-mcp-attachments)
+        Number of bytes written
     """
-    base_temp = os.environ.get('MAIL_ATTACHMENT_PATH', '/tmp')
-    return os.path.join(base_temp, 'mail-mcp-attachments')
+    if isinstance(source, Path):
+        shutil.copyfile(source, output_path)
+        return os.path.getsize(output_path)
+
+    with open(output_path, 'wb') as f:
+        f.write(source)
+    return len(source)
 
 
 def extract_attachments(
@@ -105,115 +122,95 @@ def extract_attachments(
         }
 
     try:
-        # Read email content
-        with open(file_path_obj, 'rb') as f:
-            lines = f.readlines()
-
-        # Parse .emlx format
-        if len(lines) < 2:
+        # Read email content (size line and plist metadata are skipped)
+        try:
+            raw_content = read_emlx_body(file_path_obj)
+        except ValueError as e:
             return {
                 "success": False,
-                "error": "Invalid file format or empty file"
+                "error": str(e)
             }
 
-        # Extract email content (skip size line and plist metadata)
-        email_lines = []
-        for line in lines[1:]:
-            line_str = line.decode('utf-8', errors='ignore')
-            if '<?xml version' in line_str or '<!DOCTYPE plist' in line_str or '<plist version' in line_str:
-                break
-            email_lines.append(line)
-
-        raw_content = b''.join(email_lines)
-        msg = email.message_from_bytes(raw_content, policy=email.policy.compat32)
+        msg = email.message_from_bytes(raw_content, policy=email.policy.default)
 
         # Create output directory structure
         base_dir = output_dir or get_attachment_base_dir()
         # Clean message_id for use as directory name (remove angle brackets)
         clean_message_id = message_id.strip('<>')
-        message_dir = Path(base_dir) / clean_message_id
-        message_dir.mkdir(parents=True, exist_ok=True)
+        message_dir = os.path.join(base_dir, clean_message_id)
+        os.makedirs(message_dir, exist_ok=True)
 
         # Track extraction results
         extracted = []
         not_found = []
         filenames_set = set(filenames)
+        # Mail's on-disk copies of this message's attachments, listed on first use
+        fs_index = None
 
-        # Walk through MIME parts and extract attachments
+        # Walk through MIME parts and extract attachments (iter_attachments()
+        # would skip attachments nested inside multipart/alternative)
         for part in msg.walk():
+            # Cheap checks first: nothing is decoded for parts we don't want
+            if part.is_multipart():
+                continue
+
+            # The default policy already decodes RFC 2047/2231 filenames
+            decoded_filename = part.get_filename()
+            if not decoded_filename or decoded_filename not in filenames_set:
+                continue
+
             content_type = part.get_content_type()
-            content_disposition = str(part.get('Content-Disposition', ''))
-            filename = part.get_filename()
 
             # Check if this is an attachment we're looking for
             is_attachment = (
-                'attachment' in content_disposition or
-                (filename and content_type not in ['text/plain', 'text/html'])
+                part.get_content_disposition() == 'attachment' or
+                content_type not in ['text/plain', 'text/html']
             )
-
-            if is_attachment and filename:
-                # Decode filename if encoded
-                decoded_filename = decode_header_value(filename)
-
-                # Check if this filename is in our requested list
-                if decoded_filename in filenames_set:
-                    # Get attachment payload
-                    payload = part.get_payload(decode=True)
-
-                    # If payload is empty or too small, try to find in Attachments directory
-                    if not payload or len(payload) < 100:
-                        # Try to find attachment in Mail's file system
-                        # The attachment is usually in: /path/to/.../Data/{X}/{Y}/{Z}/Attachments/{message_number}/{attachment_id}/{filename}
-                        # Path structure: .../Data/{X}/{Y}/{Z}/Messages/{number}.partial.emlx
-                        try:
-                            messages_dir = file_path_obj.parent
-                            attachments_dir = messages_dir.parent / "Attachments"
-                            message_num = file_path_obj.stem.replace('.partial', '')
-
-                            # Search in attachment subdirectories
-                            if attachments_dir.exists():
-                                # Search for the file in any subdirectory
-                                for att_dir in attachments_dir.iterdir():
-                                    if att_dir.is_dir() and att_dir.name == message_num:
-                                        for sub_dir in att_dir.iterdir():
-                                            if sub_dir.is_dir():
-                                                # Try exact match first
-                                                potential_file = sub_dir / decoded_filename
-                                                if potential_file.exists():
-                                                    # Read from file system
-                                                    payload = potential_file.read_bytes()
-                                                    break
-
-                                                # Try fuzzy match (Mail replaces / with _ in filenames)
-                                                # and other special characters
-                                                if not payload:
-                                                    # Try different variations
-                                                    alt_filename = decoded_filename.replace('/', '_').replace('\\', '_')
-                                                    potential_file = sub_dir / alt_filename
-                                                    if potential_file.exists():
-                                                        payload = potential_file.read_bytes()
-                                                        break
-                        except Exception:
-                            pass  # Fall through to empty payload handling
-
-                    if payload:
-                        # Save to file
-                        # Sanitize filename for filesystem (replace problematic characters)
-                        safe_filename = decoded_filename.replace('/', '_').replace('\\', '_').replace(':', '_')
-                        output_path = message_dir / safe_filename
-                        with open(output_path, 'wb') as f:
-                            f.write(payload)
-
-                        extracted.append({
-                            "filename": decoded_filename,  # Report original filename
-                            "safe_filename": safe_filename,  # Actual filesystem name
-                            "path": str(output_path),
-                            "mime_type": content_type,
-                            "size_bytes": len(payload)
-                        })
-
-                        # Remove from set to track what we've found
-                        filenames_set.discard(decoded_filename)
+            if not is_attachment:
+                continue
+
+            # Get attachment payload
+            payload = part.get_payload(decode=True)
+            source = payload
+
+            # If payload is empty or too small, try to find in Attachments directory
+            if not payload or len(payload) < 100:
+                # Try to find attachment in Mail's file system
+                if fs_index is None:
+                    fs_index = _index_mail_attachments(file_path_obj)
+
+                # Try exact match first, then the name Mail saves it under
+                # (Mail replaces / with _ in filenames)
+                alt_filename = decoded_filename.replace('/', '_').replace('\\', '_')
+                fs_path = fs_index.get(decoded_filename) or fs_index.get(alt_filename)
+                try:
+                    if fs_path and fs_path.stat().st_size:
+                        # Copied file-to-file, never read into memory
+                        source = fs_path
+                except OSError:
+                    pass  # Fall through to the MIME payload
+
+            if source:
+                # Save to file
+                # Sanitize filename for filesystem (replace problematic characters)
+                safe_filename = decoded_filename.replace('/', '_').replace('\\', '_').replace(':', '_')
+                output_path = os.path.join(message_dir, safe_filename)
+                size_bytes = _write_attachment(output_path, source)
+
+                extracted.append({
+                    "filename": decoded_filename,  # Report original filename
+                    "safe_filename": safe_filename,  # Actual filesystem name
+                    "path": output_path,
+                    "mime_type": content_type,
+                    "size_bytes": size_bytes
+                })
+
+                # Remove from set to track what we've found
+                filenames_set.discard(decoded_filename)
+
+                # Stop walking once every requested file has been found
+                if not filenames_set:
+                    break
 
         # Any remaining filenames in the set were not found
         not_found = list(filenames_set)
@@ -221,7 +218,7 @@ def extract_attachments(
         return {
             "success": True,
             "base_dir": base_dir,
-            "message_dir": str(message_dir),
+            "message_dir": message_dir,
             "extracted": extracted,
             "not_found": not_found
         }
@@ -235,8 +232,6 @@ def extract_attachments(
 
 def main():
     """Command line test tool"""
-    import sys
-
     if len(sys.argv) < 4:
         print("Usage: python3 extract_attachments.py <emlx_file> <message_id> <filename1> [filename2 ...]")
         print("\nExample:")
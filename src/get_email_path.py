@@ -10,95 +10,595 @@ Or import as module:
     file_path = get_email_path("<message-id@domain.com>")
 """
 
+import functools
+import os
 import sqlite3
 import sys
-import subprocess
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
+from urllib.parse import unquote
 
-# Mail database path
-MAIL_DB_PATH = Path.home() / "Library/Mail/V10/MailData/Envelope Index"
+from _mail_utils import normalize_message_id
+from _db import IMMUTABLE, MAIL_DB_PATH, reset_connections
+from _db import get_conn as _thread_conn
+
+# Mail data path
 MAIL_V10_PATH = Path.home() / "Library/Mail/V10"
 
+# SQL statements are module constants so the connection's statement
+# cache (cached_statements) always sees the exact same text.
+# Email lookup - KEY: use ROWID, not remote_id
+_SQL_FIND_BY_MID = """
+SELECT
+    m.ROWID as message_rowid,
+    mb.url as mailbox_url
+FROM messages m
+LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
+LEFT JOIN mailboxes mb ON m.mailbox = mb.ROWID
+WHERE mgd.message_id_header = ?
+"""
+
+# The Mail database is opened read-only, so when Mail.app has not indexed
+# message_id_header an index is built in a shared in-memory database
+# instead, mapping Message-ID -> messages.ROWID. Messages added after it
+# was built (ROWID above the snapshot) are found with a ROWID range seek.
+_SIDE_INDEX_URI = "file:mail-mcp-mid-index?mode=memory&cache=shared"
+
+_SQL_BUILD_SIDE_INDEX = """
+CREATE TABLE mid_map AS
+SELECT m.ROWID AS message_rowid, mgd.message_id_header
+FROM mail.messages m
+JOIN mail.message_global_data mgd ON m.global_message_id = mgd.ROWID
+WHERE mgd.message_id_header IS NOT NULL
+"""
+
+# messages.ROWID of a Message-ID (?1) given the snapshot's max ROWID (?2)
+SQL_SIDE_INDEX_ROWIDS = """(
+    SELECT message_rowid FROM mid_index.mid_map WHERE message_id_header = ?1
+    UNION ALL
+    SELECT m.ROWID
+    FROM messages m
+    JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
+    WHERE m.ROWID > ?2 AND mgd.message_id_header = ?1
+)"""
+
+_SQL_FIND_BY_MID_INDEXED = """
+SELECT
+    m.ROWID as message_rowid,
+    mb.url as mailbox_url
+FROM messages m
+LEFT JOIN mailboxes mb ON m.mailbox = mb.ROWID
+WHERE m.ROWID IN """ + SQL_SIDE_INDEX_ROWIDS
+
+# Whether the Message-ID lookup plan has been checked for a full scan
+_plan_checked = False
+_plan_lock = threading.Lock()
+
+# Highest messages.ROWID covered by the side index (None: not in use).
+# The builder connection is kept open: the in-memory database lives
+# only as long as some connection has it open.
+_side_index_max = None
+_side_index_conn = None
+
+# Per-thread marker of the connection the side index is attached to
+_attached = threading.local()
+
+# Directories inside a mailbox that never contain .emlx files
+_SKIP_DIRS = frozenset({'Attachments'})
+
+# Index of .emlx files per mailbox directory:
+# {mbox_path: (mailbox mtime, {message_rowid: file_path})}
+_mbox_index = {}
+
+# One lock per mailbox so concurrent lookups walk a mailbox only once
+_mbox_locks = {}
+_mbox_locks_guard = threading.Lock()
+
+# {mailbox-UUID} directories per mailbox: {mbox_path: (mailbox mtime, [paths])}
+_store_dir_cache = {}
+
+# Message-ID -> file path already resolved by thread lookups, consulted
+# before querying SQLite
+_path_cache = {}
+
+# Message-ID -> time.monotonic() of the last failed lookup; misses are
+# not retried until _NEG_CACHE_TTL seconds have passed. Kept in miss
+# order, so expired entries are pruned from the front; at most
+# _NEG_CACHE_SIZE entries are kept.
+_neg_cache = OrderedDict()
+_NEG_CACHE_TTL = 60
+_NEG_CACHE_SIZE = 4096
+
+# lru_cache-wrapped lookups in other modules that depend on the Mail
+# database and are cleared together with this module's caches
+_dependent_caches = []
+
+# Modification times of the Mail database (and its WAL) when the lookup
+# cache was last validated
+_db_mtime = None
+
+
+def _lookup_scans(conn):
+    """
+    Check whether Message-ID lookups would scan a whole table
+
+    Args:
+        conn: Open connection to the Mail database
+
+    Returns:
+        list: SCAN steps of the query plan (empty if fully indexed)
+    """
+    plan = conn.execute("EXPLAIN QUERY PLAN " + _SQL_FIND_BY_MID, ('',)).fetchall()
+
+    return [row[-1] for row in plan if row[-1].startswith('SCAN')]
+
+
+def _build_side_index():
+    """
+    Build the in-memory Message-ID index from a snapshot of the Mail database
+
+    Returns:
+        int: Highest messages.ROWID included in the snapshot
+    """
+    global _side_index_conn
+
+    conn = sqlite3.connect(_SIDE_INDEX_URI, uri=True, isolation_level=None,
+                           check_same_thread=False)
+    try:
+        conn.execute("ATTACH DATABASE ? AS mail", (f"{MAIL_DB_PATH.as_uri()}?mode=ro",))
+        # One read transaction, so the max ROWID matches the copied rows
+        conn.execute("BEGIN")
+        max_rowid = conn.execute("SELECT COALESCE(MAX(ROWID), 0) FROM mail.messages").fetchone()[0]
+        conn.execute(_SQL_BUILD_SIDE_INDEX)
+        conn.execute("CREATE INDEX mid_map_header ON mid_map(message_id_header)")
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE mail")
+    except sqlite3.Error:
+        conn.close()
+        raise
+
+    _side_index_conn = conn
+    return max_rowid
+
+
+def get_conn():
+    """
+    Get this thread's read-only connection to the Mail database
+
+    The first call also checks the lookup query plan and, if Message-ID
+    lookups would scan a table, builds the in-memory side index. Every
+    connection then attaches it as `mid_index`.
+
+    Returns:
+        sqlite3.Connection: Connection opened in read-only mode
+    """
+    global _plan_checked, _side_index_max
+
+    conn = _thread_conn()
+    if not _plan_checked:
+        with _plan_lock:
+            if not _plan_checked:
+                scans = _lookup_scans(conn)
+                if scans:
+                    print(
+                        f"Warning: Message-ID lookups scan the Mail database "
+                        f"({'; '.join(scans)}), building an in-memory index",
+                        file=sys.stderr
+                    )
+                    try:
+                        _side_index_max = _build_side_index()
+                    except sqlite3.Error as e:
+                        print(f"Warning: Failed to build Message-ID index: {e}", file=sys.stderr)
+                _plan_checked = True
+
+    if _side_index_max is not None and getattr(_attached, 'conn', None) is not conn:
+        conn.execute("ATTACH DATABASE ? AS mid_index", (_SIDE_INDEX_URI,))
+        _attached.conn = conn
+    return conn
+
+
+def execute_by_mid(sql, indexed_sql, message_id):
+    """
+    Run a Message-ID lookup, through the side index when it is in use
+
+    Args:
+        sql: Query taking the Message-ID as its only parameter
+        indexed_sql: Same query against mid_index (e.g. via
+                     SQL_SIDE_INDEX_ROWIDS), with the Message-ID as ?1
+                     and the index's max ROWID as ?2
+        message_id: RFC Message-ID including angle brackets
+
+    Returns:
+        sqlite3.Cursor: Cursor over the query results
+    """
+    conn = get_conn()
+    if _side_index_max is None:
+        return conn.execute(sql, (message_id,))
+    return conn.execute(indexed_sql, (message_id, _side_index_max))
+
+
+def _bucket_dir(message_rowid):
+    """
+    Relative directory in which Mail stores a message's .emlx file
+
+    Below each mailbox's Data/ directory, messages are bucketed by
+    ROWID // 1000 with its digits reversed, one directory per digit:
+    ROWID 5 -> Messages, 12345 -> 2/1/Messages, 123456 -> 3/2/1/Messages.
+
+    Args:
+        message_rowid: messages.ROWID of the email
+
+    Returns:
+        str: Path relative to Data/, e.g. "3/2/1/Messages"
+    """
+    thousands = str(message_rowid // 1000) if message_rowid >= 1000 else ''
+    return os.path.join(*thousands[::-1], 'Messages')
+
+
+def _store_dirs(mbox_path, mtime):
+    """
+    List the {mailbox-UUID} directories of a mailbox
+
+    Cached until the mailbox directory's modification time changes.
+
+    Args:
+        mbox_path: Mailbox directory (*.mbox)
+        mtime: Current st_mtime_ns of mbox_path
+
+    Returns:
+        list: Store directory paths (usually exactly one)
+    """
+    cached = _store_dir_cache.get(mbox_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        with os.scandir(mbox_path) as it:
+            store_dirs = [
+                entry.path for entry in it
+                if entry.is_dir(follow_symlinks=False) and not entry.name.endswith('.mbox')
+            ]
+    except OSError:
+        return []
+
+    _store_dir_cache[mbox_path] = (mtime, store_dirs)
+    return store_dirs
+
+
+def _probe_bucket(mbox_path, message_rowid, mtime):
+    """
+    Check the expected bucket path of a message without walking the mailbox
+
+    Args:
+        mbox_path: Mailbox directory (*.mbox)
+        message_rowid: messages.ROWID of the email
+        mtime: Current st_mtime_ns of mbox_path
+
+    Returns:
+        str: Absolute path to email file, or None if not at the expected path
+    """
+    bucket = _bucket_dir(message_rowid)
+
+    for store_dir in _store_dirs(mbox_path, mtime):
+        messages_dir = os.path.join(store_dir, 'Data', bucket)
+        for name in (f'{message_rowid}.emlx', f'{message_rowid}.partial.emlx'):
+            file_path = os.path.join(messages_dir, name)
+            if os.path.isfile(file_path):
+                return file_path
+
+    return None
+
+
+def _iter_emlx(directory):
+    """
+    Recursively yield every .emlx file under a mailbox directory
+
+    Symlinked directories, Mail's Attachments/ caches and nested
+    mailboxes (*.mbox, indexed on their own) are not descended into.
+
+    Args:
+        directory: Directory to scan
+
+    Yields:
+        os.DirEntry: Entry of each .emlx file
+    """
+    try:
+        with os.scandir(directory) as it:
+            subdirs = []
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _SKIP_DIRS and not entry.name.endswith('.mbox'):
+                        subdirs.append(entry.path)
+                elif entry.name.endswith('.emlx'):
+                    yield entry
+    except OSError:
+        return
+
+    for subdir in subdirs:
+        yield from _iter_emlx(subdir)
+
+
+def _index_mbox(mbox_path):
+    """
+    Map every message ROWID in a mailbox to its .emlx file
+
+    Handles {ROWID}.emlx and {ROWID}.partial.emlx filenames.
+
+    Args:
+        mbox_path: Mailbox directory (*.mbox)
+
+    Returns:
+        dict: {message_rowid: file_path}
+    """
+    index = {}
+    for entry in _iter_emlx(mbox_path):
+        rowid = entry.name.split('.', 1)[0].split('_', 1)[0]
+        if rowid.isdigit():
+            index.setdefault(int(rowid), entry.path)
+    return index
+
+
+def _mbox_lock(mbox_path):
+    """
+    Get the lock that serializes index rebuilds of one mailbox
+
+    Args:
+        mbox_path: Mailbox directory (*.mbox)
+
+    Returns:
+        threading.Lock: Lock for this mailbox
+    """
+    with _mbox_locks_guard:
+        return _mbox_locks.setdefault(mbox_path, threading.Lock())
+
+
+def _find_emlx(mbox_path, message_rowid):
+    """
+    Find the .emlx file of a message
+
+    Tries the cached mailbox index, then the expected bucket path, and
+    only then (re)builds the index with a full walk. The index is rebuilt
+    when the mailbox directory changes, or when the ROWID is missing from
+    it (new mail is stored in nested directories that do not touch the
+    mailbox's own modification time). Concurrent lookups that miss share
+    a single rebuild.
+
+    Args:
+        mbox_path: Mailbox directory (*.mbox)
+        message_rowid: messages.ROWID of the email
+
+    Returns:
+        str: Absolute path to email file, or None if not found
+    """
+    try:
+        mtime = os.stat(mbox_path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _mbox_index.get(mbox_path)
+    if cached is not None and cached[0] == mtime:
+        file_path = cached[1].get(message_rowid)
+        if file_path and os.path.exists(file_path):
+            return file_path
+
+    file_path = _probe_bucket(mbox_path, message_rowid, mtime)
+    if file_path:
+        return file_path
+
+    with _mbox_lock(mbox_path):
+        # Another thread may have rebuilt the index while we waited
+        current = _mbox_index.get(mbox_path)
+        if current is not None and current is not cached and current[0] == mtime:
+            return current[1].get(message_rowid)
+
+        index = _index_mbox(mbox_path)
+        _mbox_index[mbox_path] = (mtime, index)
+    return index.get(message_rowid)
+
+
+@functools.lru_cache(maxsize=1024)
+def _mailbox_dir(mailbox_url):
+    """
+    Map a mailbox URL to its directory under the Mail data path
+
+    Mailbox URLs are few and fixed, so the parsed result is cached.
+
+    Args:
+        mailbox_url: mailboxes.url, e.g. imap://ACCOUNT-UUID/INBOX
+
+    Returns:
+        Path: Mailbox directory (*.mbox), or None for non-IMAP URLs
+    """
+    # Parse mailbox URL
+    # Format: imap://ACCOUNT-UUID/MAILBOX-PATH
+    if not mailbox_url.startswith('imap://'):
+        return None
+
+    parts = mailbox_url.replace('imap://', '').split('/', 1)
+    account_uuid = parts[0]
+    mailbox_path = parts[1] if len(parts) > 1 else ''
+
+    # Most mailbox names are plain ASCII; only decode when escaped
+    if '%' in mailbox_path:
+        mailbox_path = unquote(mailbox_path)
+
+    # Build mailbox directory path: {account_uuid}/{part}.mbox/{part}.mbox/...
+    segments = [f"{part}.mbox" for part in mailbox_path.split('/') if part]
+    return Path(MAIL_V10_PATH, account_uuid, *segments)
+
+
+def resolve_email_file(message_rowid, mailbox_url):
+    """
+    Locate the .emlx file for a message row
+
+    Args:
+        message_rowid: messages.ROWID (the .emlx filename)
+        mailbox_url: mailboxes.url, e.g. imap://ACCOUNT-UUID/INBOX
+
+    Returns:
+        str: Absolute path to email file, or None if not found
+    """
+    if not message_rowid or not mailbox_url:
+        return None
+
+    mbox_path = _mailbox_dir(mailbox_url)
+    if mbox_path is None:
+        return None
+
+    # Find .emlx file - use ROWID, not remote_id
+    return _find_emlx(mbox_path, message_rowid)
+
+
+def invalidate():
+    """
+    Drop all cached Message-ID lookups
+
+    Called automatically when the Mail database changes on disk.
+    """
+    _resolve.cache_clear()
+    _mailbox_dir.cache_clear()
+    _path_cache.clear()
+    _neg_cache.clear()
+    for cached_fn in _dependent_caches:
+        cached_fn.cache_clear()
+    if IMMUTABLE:
+        reset_connections()
+
+
+def register_cache(cached_fn):
+    """
+    Clear an lru_cache-wrapped function whenever the Mail database changes
+
+    Args:
+        cached_fn: Function decorated with functools.lru_cache
+
+    Returns:
+        The same function, so this can be used as a decorator
+    """
+    _dependent_caches.append(cached_fn)
+    return cached_fn
+
+
+def remember_email_path(message_id, file_path):
+    """
+    Record a path resolved elsewhere (e.g. by a thread lookup)
+
+    Later get_email_path() calls for the same Message-ID return it
+    without touching SQLite, until the Mail database changes.
+
+    Args:
+        message_id: RFC Message-ID including angle brackets
+        file_path: Absolute path to the email file
+    """
+    _path_cache[message_id] = file_path
+
+
+def check_db_mtime():
+    """
+    Invalidate the lookup cache if Mail has written to its database
+
+    New mail lands in the WAL file before it is checkpointed into the
+    main database, so both modification times are tracked.
+    """
+    global _db_mtime
+
+    try:
+        db_mtime = MAIL_DB_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Mail database not found: {MAIL_DB_PATH}") from None
+
+    try:
+        wal_mtime = os.stat(f"{MAIL_DB_PATH}-wal").st_mtime_ns
+    except OSError:
+        wal_mtime = 0
+
+    mtime = (db_mtime, wal_mtime)
+    if mtime != _db_mtime:
+        invalidate()
+        _db_mtime = mtime
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolve(message_id):
+    """
+    Resolve a normalized Message-ID to its database row and file path
+
+    Misses raise LookupError instead of returning None so that they are
+    not cached: the email may still be downloading.
+
+    Args:
+        message_id: RFC Message-ID including angle brackets
+
+    Returns:
+        tuple: (message_rowid, mailbox_url, file_path)
+
+    Raises:
+        LookupError: If the Message-ID or its file cannot be found
+    """
+    result = execute_by_mid(_SQL_FIND_BY_MID, _SQL_FIND_BY_MID_INDEXED, message_id).fetchone()
+
+    if not result:
+        raise LookupError(message_id)
+
+    message_rowid, mailbox_url = result
+    file_path = resolve_email_file(message_rowid, mailbox_url)
+
+    if not file_path:
+        raise LookupError(message_id)
+
+    return message_rowid, mailbox_url, file_path
+
+
+def _remember_miss(message_id):
+    """
+    Record a failed lookup, pruning expired and excess entries
+
+    Args:
+        message_id: RFC Message-ID including angle brackets
+    """
+    now = time.monotonic()
+    _neg_cache[message_id] = now
+    _neg_cache.move_to_end(message_id)
+
+    while _neg_cache:
+        oldest_id, missed_at = next(iter(_neg_cache.items()))
+        if now - missed_at < _NEG_CACHE_TTL and len(_neg_cache) <= _NEG_CACHE_SIZE:
+            break
+        del _neg_cache[oldest_id]
+
 
 def get_email_path(message_id):
     """
     Get email file path by RFC Message-ID
 
+    Results are cached until the Mail database changes on disk; misses
+    are remembered for _NEG_CACHE_TTL seconds.
+
     Args:
         message_id: RFC Message-ID, e.g. <abc@example.com>
 
     Returns:
         str: Absolute path to email file, or None if not found
     """
-    # Ensure Message-ID includes angle brackets
-    if not message_id.startswith('<'):
-        message_id = f'<{message_id}>'
+    message_id = normalize_message_id(message_id)
 
-    if not MAIL_DB_PATH.exists():
-        raise FileNotFoundError(f"Mail database not found: {MAIL_DB_PATH}")
+    check_db_mtime()
 
-    # Connect to database
-    conn = sqlite3.connect(str(MAIL_DB_PATH))
-    cursor = conn.cursor()
-
-    try:
-        # Query email info - KEY: use ROWID, not remote_id
-        query = """
-        SELECT
-            m.ROWID as message_rowid,
-            mb.url as mailbox_url
-        FROM messages m
-        LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
-        LEFT JOIN mailboxes mb ON m.mailbox = mb.ROWID
-        WHERE mgd.message_id_header = ?
-        """
-
-        cursor.execute(query, (message_id,))
-        result = cursor.fetchone()
-
-        if not result:
-            return None
-
-        message_rowid, mailbox_url = result
-
-        if not message_rowid or not mailbox_url:
-            return None
-
-        # Parse mailbox URL
-        # Format: imap://ACCOUNT-UUID/MAILBOX-PATH
-        if not mailbox_url.startswith('imap://'):
-            return None
-
-        import urllib.parse
-        parts = mailbox_url.replace('imap://', '').split('/', 1)
-        account_uuid = parts[0]
-        mailbox_path = urllib.parse.unquote(parts[1]) if len(parts) > 1 else ''
-
-        # Build mailbox directory path
-        mbox_path = MAIL_V10_PATH / account_uuid
-
-        for part in mailbox_path.split('/'):
-            if part:
-                mbox_path = mbox_path / f"{part}.mbox"
-
-        # Find .emlx file - use ROWID, not remote_id
-        if mbox_path.exists():
-            # Use find command to locate file
-            result = subprocess.run(
-                ['find', str(mbox_path), '-name', f'{message_rowid}*.emlx'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            files = [f for f in result.stdout.strip().split('\n') if f]
-            if files:
-                return files[0]
+    file_path = _path_cache.get(message_id)
+    if file_path:
+        return file_path
 
+    missed_at = _neg_cache.get(message_id)
+    if missed_at is not None and time.monotonic() - missed_at < _NEG_CACHE_TTL:
         return None
 
-    finally:
-        conn.close()
+    try:
+        return _resolve(message_id)[2]
+    except LookupError:
+        _remember_miss(message_id)
+        return None
 
 
 def main():
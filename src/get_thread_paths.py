@@ -3,87 +3,179 @@
 Get file paths of all emails in a thread
 
 Usage:
-    python3 get_thread_paths.py "<message-id@domain.com>"
+    python3 get_thread_paths.py "<message-id@domain.com>" ["<other-id@domain.com>" ...]
 
 Or import as module:
     from get_thread_paths import get_thread_paths
     paths = get_thread_paths("<message-id@domain.com>")
 """
 
-import sqlite3
+import functools
+import json
 import sys
-from pathlib import Path
-from get_email_path import get_email_path
+from concurrent.futures import ThreadPoolExecutor
+
+from _mail_utils import normalize_message_id
+from get_email_path import (
+    SQL_SIDE_INDEX_ROWIDS, execute_by_mid, resolve_email_file, remember_email_path,
+    register_cache, check_db_mtime, get_conn
+)
+
+
+# Files of a thread are located concurrently; each lookup is a few
+# stat/scandir calls, which release the GIL
+RESOLVE_WORKERS = 8
+_resolve_pool = ThreadPoolExecutor(max_workers=RESOLVE_WORKERS, thread_name_prefix="mail-resolve")
+
+# SQL statements are module constants so the shared connection's
+# statement cache always sees the exact same text
+_SQL_FIND_CONV_ID = """
+SELECT m.conversation_id
+FROM messages m
+LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
+WHERE mgd.message_id_header = ?
+"""
+
+_SQL_FIND_CONV_ID_INDEXED = """
+SELECT m.conversation_id
+FROM messages m
+WHERE m.ROWID IN """ + SQL_SIDE_INDEX_ROWIDS
+
+_SQL_FIND_THREAD_ROWS = """
+SELECT m.ROWID, mb.url, mgd.message_id_header
+FROM messages m
+LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
+LEFT JOIN mailboxes mb ON m.mailbox = mb.ROWID
+WHERE m.conversation_id = (
+    SELECT m2.conversation_id
+    FROM messages m2
+    LEFT JOIN message_global_data mgd2 ON m2.global_message_id = mgd2.ROWID
+    WHERE mgd2.message_id_header = ?
+)
+AND mgd.message_id_header IS NOT NULL
+ORDER BY m.date_sent ASC
+"""
+
+_SQL_FIND_THREAD_ROWS_INDEXED = """
+SELECT m.ROWID, mb.url, mgd.message_id_header
+FROM messages m
+LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
+LEFT JOIN mailboxes mb ON m.mailbox = mb.ROWID
+WHERE m.conversation_id = (
+    SELECT m2.conversation_id
+    FROM messages m2
+    WHERE m2.ROWID IN """ + SQL_SIDE_INDEX_ROWIDS + """
+)
+AND mgd.message_id_header IS NOT NULL
+ORDER BY m.date_sent ASC
+"""
+
+
+# Every email of several conversations; the conversation_ids are bound
+# as one JSON array so the statement text never changes
+_SQL_FIND_THREADS_ROWS = """
+SELECT m.conversation_id, m.ROWID, mb.url, mgd.message_id_header
+FROM messages m
+LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
+LEFT JOIN mailboxes mb ON m.mailbox = mb.ROWID
+WHERE m.conversation_id IN (SELECT value FROM json_each(?))
+AND mgd.message_id_header IS NOT NULL
+ORDER BY m.conversation_id, m.date_sent ASC
+"""
+
+
+@register_cache
+@functools.lru_cache(maxsize=4096)
+def _conversation_id(message_id):
+    """
+    Look up the conversation_id of a normalized Message-ID
 
-# Mail database path
-MAIL_DB_PATH = Path.home() / "Library/Mail/V10/MailData/Envelope Index"
+    Misses raise LookupError so they are not cached.
+
+    Args:
+        message_id: RFC Message-ID including angle brackets
+
+    Returns:
+        int: conversation_id
+
+    Raises:
+        LookupError: If the Message-ID is not in the database
+    """
+    result = execute_by_mid(_SQL_FIND_CONV_ID, _SQL_FIND_CONV_ID_INDEXED, message_id).fetchone()
+
+    if not result:
+        raise LookupError(message_id)
+
+    return result[0]
 
 
 def get_conversation_id(message_id):
     """
     Get conversation_id by Message-ID
 
+    Results are cached until the Mail database changes on disk.
+
     Args:
         message_id: RFC Message-ID
 
     Returns:
         int: conversation_id, or None if not found
     """
-    if not message_id.startswith('<'):
-        message_id = f'<{message_id}>'
-
-    if not MAIL_DB_PATH.exists():
-        raise FileNotFoundError(f"Mail database not found: {MAIL_DB_PATH}")
+    message_id = normalize_message_id(message_id)
 
-    conn = sqlite3.connect(str(MAIL_DB_PATH))
-    cursor = conn.cursor()
+    check_db_mtime()
 
     try:
-        query = """
-        SELECT m.conversation_id
-        FROM messages m
-        LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
-        WHERE mgd.message_id_header = ?
-        """
-        cursor.execute(query, (message_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
-    finally:
-        conn.close()
-
-
-def get_thread_message_ids(conversation_id):
+        return _conversation_id(message_id)
+    except LookupError:
+        return None
+
+
+def get_thread_rows(message_id):
     """
-    Get all Message-IDs for a given conversation_id
+    Get ROWID, mailbox URL and Message-ID of every email in a thread with one query
 
     Args:
-        conversation_id: Conversation ID
+        message_id: Message-ID of any email in the thread
 
     Returns:
-        list: Message-ID list, sorted by time
+        list: (message_rowid, mailbox_url, message_id) tuples, sorted by time
     """
-    if not MAIL_DB_PATH.exists():
-        raise FileNotFoundError(f"Mail database not found: {MAIL_DB_PATH}")
+    message_id = normalize_message_id(message_id)
 
-    conn = sqlite3.connect(str(MAIL_DB_PATH))
-    cursor = conn.cursor()
+    return execute_by_mid(_SQL_FIND_THREAD_ROWS, _SQL_FIND_THREAD_ROWS_INDEXED, message_id).fetchall()
 
-    try:
-        query = """
-        SELECT mgd.message_id_header
-        FROM messages m
-        LEFT JOIN message_global_data mgd ON m.global_message_id = mgd.ROWID
-        WHERE m.conversation_id = ?
-        ORDER BY m.date_sent ASC
-        """
 
-        cursor.execute(query, (conversation_id,))
-        results = cursor.fetchall()
+def get_thread_entries(message_id, include_not_found=False):
+    """
+    Get Message-IDs and file paths of all emails in a thread
 
-        return [row[0] for row in results if row[0]]
+    Resolved paths are remembered, so a later get_email_path() call for
+    any message of the thread skips the database.
 
-    finally:
-        conn.close()
+    Args:
+        message_id: Message-ID of any email in the thread
+        include_not_found: Whether to include emails without files (path is None)
+
+    Returns:
+        list: (message_id, file_path) tuples, sorted by email sent time
+    """
+    check_db_mtime()
+
+    # One query for the whole thread, then resolve the files on disk in
+    # parallel (map keeps the sent-time order)
+    rows = get_thread_rows(message_id)
+    file_paths = _resolve_pool.map(lambda row: resolve_email_file(row[0], row[1]), rows)
+
+    entries = []
+    for (_, _, msg_id), file_path in zip(rows, file_paths):
+        if file_path:
+            remember_email_path(msg_id, file_path)
+            entries.append((msg_id, file_path))
+        elif include_not_found:
+            entries.append((msg_id, None))
+
+    return entries
 
 
 def get_thread_paths(message_id, include_not_found=False):
@@ -97,29 +189,72 @@ def get_thread_paths(message_id, include_not_found=False):
     Returns:
         list: File path list, sorted by email sent time
     """
-    # 1. Get conversation_id
-    conversation_id = get_conversation_id(message_id)
+    return [path for _, path in get_thread_entries(message_id, include_not_found)]
 
-    if not conversation_id:
-        return []
 
-    # 2. Get all Message-IDs in the thread
-    message_ids = get_thread_message_ids(conversation_id)
+def get_thread_paths_bulk(message_ids, include_not_found=False):
+    """
+    Get file paths of the threads of several emails
 
-    if not message_ids:
-        return []
+    The emails of all threads are fetched with a single query keyed on
+    conversation_id, and the files are located on the shared pool.
 
-    # 3. Get file path for each email
-    paths = []
-    for msg_id in message_ids:
-        file_path = get_email_path(msg_id)
+    Args:
+        message_ids: Message-IDs, each of any email in a thread
+        include_not_found: Whether to include emails without files (returns None)
 
+    Returns:
+        dict: {normalized Message-ID: file path list sorted by sent time};
+              Message-IDs that are not in the database map to []
+    """
+    check_db_mtime()
+
+    conversation_ids = {}
+    for message_id in message_ids:
+        message_id = normalize_message_id(message_id)
+        try:
+            conversation_ids[message_id] = _conversation_id(message_id)
+        except LookupError:
+            conversation_ids[message_id] = None
+
+    wanted = sorted({cid for cid in conversation_ids.values() if cid is not None})
+    rows = get_conn().execute(_SQL_FIND_THREADS_ROWS, (json.dumps(wanted),)).fetchall()
+    file_paths = _resolve_pool.map(lambda row: resolve_email_file(row[1], row[2]), rows)
+
+    threads = {}
+    for (conversation_id, _, _, msg_id), file_path in zip(rows, file_paths):
         if file_path:
-            paths.append(file_path)
-        elif include_not_found:
-            paths.append(None)
+            remember_email_path(msg_id, file_path)
+        if file_path or include_not_found:
+            threads.setdefault(conversation_id, []).append(file_path)
+
+    return {
+        message_id: list(threads.get(conversation_id, []))
+        for message_id, conversation_id in conversation_ids.items()
+    }
+
 
-    return paths
+def _print_threads(message_ids):
+    """Print the file paths of several threads (CLI with multiple Message-IDs)"""
+    results = get_thread_paths_bulk(message_ids, include_not_found=True)
+
+    found_any = False
+    for message_id, paths in results.items():
+        print("=" * 80)
+        print(f"📧 Thread of {message_id}")
+        print("=" * 80)
+
+        if not paths:
+            print(f"❌ Message-ID not found: {message_id}\n")
+            continue
+
+        found = [path for path in paths if path]
+        found_any = found_any or bool(found)
+        for path in paths:
+            print(path if path else "❌ File not found")
+        print(f"\n✅ Found {len(found)}/{len(paths)} email files\n")
+
+    return 0 if found_any else 1
 
 
 def main():
@@ -127,13 +262,19 @@ def main():
         print("Usage: python3 get_thread_paths.py \"<message-id@domain.com>\"")
         print("\nExample:")
         print("  python3 get_thread_paths.py \"<abc123@example.com>\"")
+        print("  python3 get_thread_paths.py \"<abc123@example.com>\" \"<def456@example.com>\"")
         sys.exit(1)
 
+    if len(sys.argv) > 2:
+        try:
+            return _print_threads(sys.argv[1:])
+        except FileNotFoundError as e:
+            print(f"❌ Error: {e}")
+            return 1
+
     message_id = sys.argv[1]
 
-    # Ensure includes angle brackets
-    if not message_id.startswith('<'):
-        message_id = f'<{message_id}>'
+    message_id = normalize_message_id(message_id)
 
     print(f"Looking up email thread: {message_id}\n")
 
@@ -147,19 +288,16 @@ def main():
 
         print(f"Found Conversation ID: {conversation_id}")
 
-        # Get all Message-IDs
-        message_ids = get_thread_message_ids(conversation_id)
-        print(f"Thread contains {len(message_ids)} emails\n")
-
-        # Get all file paths
-        paths = get_thread_paths(message_id, include_not_found=True)
+        # Message-IDs and file paths of the whole thread in one query
+        entries = get_thread_entries(message_id, include_not_found=True)
+        print(f"Thread contains {len(entries)} emails\n")
 
         print("=" * 80)
         print(f"📧 Email Thread File Paths (Conversation ID: {conversation_id})")
         print("=" * 80)
 
         found_count = 0
-        for i, (msg_id, path) in enumerate(zip(message_ids, paths), 1):
+        for i, (msg_id, path) in enumerate(entries, 1):
             print(f"\n[{i}] Message-ID: {msg_id}")
             if path:
                 print(f"    Path: {path}")
@@ -168,13 +306,13 @@ def main():
                 print(f"    Path: ❌ File not found")
 
         print("\n" + "=" * 80)
-        print(f"✅ Found {found_count}/{len(message_ids)} email files")
+        print(f"✅ Found {found_count}/{len(entries)} email files")
         print("=" * 80)
 
         # Output plain path list (for script processing)
         if found_count > 0:
             print(f"\n📝 File path list (for scripts):")
-            for path in paths:
+            for _, path in entries:
                 if path:
                     print(path)
 
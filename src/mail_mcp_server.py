@@ -14,15 +14,19 @@ Run with:
     python3 mail_mcp_server.py
 """
 
+import os
 import sys
 import json
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add current directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from get_email_path import get_email_path as get_single_email_path
-from get_thread_paths import get_thread_paths as get_all_thread_paths
+from get_thread_paths import get_thread_entries
 from parse_email import parse_email_file
 from extract_attachments import extract_attachments
 from cleanup_attachments import cleanup_attachments
@@ -36,434 +40,403 @@ except ImportError:
     print("Please run: pip install mcp", file=sys.stderr)
     sys.exit(1)
 
+# Optional: orjson serializes large thread responses several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # Create MCP server
 app = Server("mail-server")
 
+# Maximum number of emails parsed concurrently by read_thread
+THREAD_PARSE_CONCURRENCY = 8
+
+# Worker threads for blocking SQLite, filesystem and parsing work
+# (installed as the event loop's default executor in main())
+executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="mail-worker")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_cached(path, mtime_ns, size, max_body_length, strip_quotes, headers_only):
+    """Parse an email; cached per file version (mtime and size) and options"""
+    return parse_email_file(
+        path,
+        max_body_length=max_body_length,
+        strip_quotes=strip_quotes,
+        headers_only=headers_only
+    )
+
+
+def parse_email_cached(path, max_body_length=None, strip_quotes=False, headers_only=False):
+    """
+    Parse an email file, reusing the previous result while it is unchanged
+
+    The returned dict is shared between calls and must not be modified.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        # Let the parser report the missing file
+        return parse_email_file(
+            path,
+            max_body_length=max_body_length,
+            strip_quotes=strip_quotes,
+            headers_only=headers_only
+        )
 
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List all available tools"""
-    return [
-        Tool(
-            name="get_email_path",
-            description="Get the absolute path to an email file by RFC Message-ID. "
-                       "Message-ID is the unique identifier for an email, formatted like <abc123@example.com>. "
-                       "Returns the full path to the email file in the filesystem, which can be used to read email content.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "message_id": {
-                        "type": "string",
-                        "description": "RFC Message-ID, e.g. <abc123@example.com>. Can include or exclude angle brackets."
-                    }
-                },
-                "required": ["message_id"]
-            }
-        ),
-        Tool(
-            name="get_thread_paths",
-            description="Get file paths of all emails in a thread by Message-ID of any email in the thread. "
-                       "An email thread is a group of related emails (such as the original email and all replies). "
-                       "Returns a list of paths to all email files in the thread, sorted chronologically, "
-                       "useful for analyzing complete email conversations.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "message_id": {
-                        "type": "string",
-                        "description": "RFC Message-ID of any email in the thread."
-                    }
+    return _parse_cached(path, st.st_mtime_ns, st.st_size, max_body_length, strip_quotes, headers_only)
+
+
+# Tool definitions, built once at import time
+TOOLS = [
+    Tool(
+        name="get_email_path",
+        description="Get the absolute path to an email file by RFC Message-ID. "
+                   "Message-ID is the unique identifier for an email, formatted like <abc123@example.com>. "
+                   "Returns the full path to the email file in the filesystem, which can be used to read email content.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "message_id": {
+                    "type": "string",
+                    "description": "RFC Message-ID, e.g. <abc123@example.com>. Can include or exclude angle brackets."
+                }
+            },
+            "required": ["message_id"]
+        }
+    ),
+    Tool(
+        name="get_thread_paths",
+        description="Get file paths of all emails in a thread by Message-ID of any email in the thread. "
+                   "An email thread is a group of related emails (such as the original email and all replies). "
+                   "Returns a list of paths to all email files in the thread, sorted chronologically, "
+                   "useful for analyzing complete email conversations.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "message_id": {
+                    "type": "string",
+                    "description": "RFC Message-ID of any email in the thread."
+                }
+            },
+            "required": ["message_id"]
+        }
+    ),
+    Tool(
+        name="read_email",
+        description="Parse and read plain text content of an email by RFC Message-ID. "
+                   "Returns structured information including subject, sender, recipient, date, body text, etc., "
+                   "enabling AI to analyze email content directly without handling raw .emlx files. "
+                   "Body text is limited by default but can be overridden for full content access.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "message_id": {
+                    "type": "string",
+                    "description": "RFC Message-ID, e.g. <abc123@example.com>. Can include or exclude angle brackets."
                 },
-                "required": ["message_id"]
-            }
-        ),
-        Tool(
-            name="read_email",
-            description="Parse and read plain text content of an email by RFC Message-ID. "
-                       "Returns structured information including subject, sender, recipient, date, body text, etc., "
-                       "enabling AI to analyze email content directly without handling raw .emlx files. "
-                       "Body text is limited by default but can be overridden for full content access.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "message_id": {
-                        "type": "string",
-                        "description": "RFC Message-ID, e.g. <abc123@example.com>. Can include or exclude angle brackets."
-                    },
-                    "max_body_length": {
-                        "type": "number",
-                        "description": "Maximum body length in characters. "
-                                     "0 = unlimited. "
-                                     "If not specified, uses MAIL_SINGLE_MAX_BODY_LENGTH env var (default: 10000)"
-                    }
+                "max_body_length": {
+                    "type": "number",
+                    "description": "Maximum body length in characters. "
+                                 "0 = unlimited. "
+                                 "If not specified, uses MAIL_SINGLE_MAX_BODY_LENGTH env var (default: 10000)"
                 },
-                "required": ["message_id"]
-            }
-        ),
-        Tool(
-            name="read_thread",
-            description="Parse and read all emails in a thread by Message-ID of any email in the thread. "
-                       "An email thread is a group of related emails (such as the original email and all replies). "
-                       "Returns structured content of all emails in the thread, sorted chronologically, "
-                       "enabling AI to analyze complete email conversations. "
-                       "Email bodies are truncated by default to prevent excessive data in long threads.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "message_id": {
-                        "type": "string",
-                        "description": "RFC Message-ID of any email in the thread."
-                    },
-                    "max_body_length": {
-                        "type": "number",
-                        "description": "Maximum body length per email in characters. "
-                                     "0 = unlimited. "
-                                     "If not specified, uses MAIL_THREAD_MAX_BODY_LENGTH env var (default: 1200)"
-                    }
+                "headers_only": {
+                    "type": "boolean",
+                    "description": "Return only headers and the attachment list, skipping body decoding "
+                                 "(body_text is empty). Much faster for large emails. Default: false"
+                }
+            },
+            "required": ["message_id"]
+        }
+    ),
+    Tool(
+        name="read_thread",
+        description="Parse and read all emails in a thread by Message-ID of any email in the thread. "
+                   "An email thread is a group of related emails (such as the original email and all replies). "
+                   "Returns structured content of all emails in the thread, sorted chronologically, "
+                   "enabling AI to analyze complete email conversations. "
+                   "Email bodies are truncated by default to prevent excessive data in long threads.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "message_id": {
+                    "type": "string",
+                    "description": "RFC Message-ID of any email in the thread."
                 },
-                "required": ["message_id"]
-            }
-        ),
-        Tool(
-            name="extract_attachments",
-            description="Extract specific attachments from an email by Message-ID and attachment filenames. "
-                       "Extracts attachments to a temporary directory (configured by MAIL_ATTACHMENT_PATH env var, "
-                       "defaults to /tmp/mail-mcp-attachments). Files are saved in subdirectories named by message-id "
-                       "for easy organization and cleanup. Returns the extracted file paths for further processing.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "message_id": {
-                        "type": "string",
-                        "description": "RFC Message-ID, e.g. <abc123@example.com>. Can include or exclude angle brackets."
-                    },
-                    "filenames": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "List of attachment filenames to extract (as shown in read_email attachments list)"
-                    }
+                "max_body_length": {
+                    "type": "number",
+                    "description": "Maximum body length per email in characters. "
+                                 "0 = unlimited. "
+                                 "If not specified, uses MAIL_THREAD_MAX_BODY_LENGTH env var (default: 1200)"
+                }
+            },
+            "required": ["message_id"]
+        }
+    ),
+    Tool(
+        name="extract_attachments",
+        description="Extract specific attachments from an email by Message-ID and attachment filenames. "
+                   "Extracts attachments to a temporary directory (configured by MAIL_ATTACHMENT_PATH env var, "
+                   "defaults to /tmp/mail-mcp-attachments). Files are saved in subdirectories named by message-id "
+                   "for easy organization and cleanup. Returns the extracted file paths for further processing.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "message_id": {
+                    "type": "string",
+                    "description": "RFC Message-ID, e.g. <abc123@example.com>. Can include or exclude angle brackets."
                 },
-                "required": ["message_id", "filenames"]
-            }
-        ),
-        Tool(
-            name="cleanup_attachments",
-            description="Clean up temporary attachment directories created by extract_attachments. "
-                       "Removes all files in the specified message-id directories. Use this after processing "
-                       "attachments to free up disk space. Supports cleaning up multiple message-ids at once.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "message_ids": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "List of RFC Message-IDs to clean up. Can include or exclude angle brackets."
-                    }
+                "filenames": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "List of attachment filenames to extract (as shown in read_email attachments list)"
+                }
+            },
+            "required": ["message_id", "filenames"]
+        }
+    ),
+    Tool(
+        name="cleanup_attachments",
+        description="Clean up temporary attachment directories created by extract_attachments. "
+                   "Removes all files in the specified message-id directories. Use this after processing "
+                   "attachments to free up disk space. Supports cleaning up multiple message-ids at once.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "message_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "List of RFC Message-IDs to clean up. Can include or exclude angle brackets."
                 },
-                "required": ["message_ids"]
-            }
-        )
+                "compute_stats": {
+                    "type": "boolean",
+                    "description": "Report files_removed and size_freed for each directory. "
+                                 "Costs one stat per file. Default: false"
+                }
+            },
+            "required": ["message_ids"]
+        }
+    )
+]
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List all available tools"""
+    return TOOLS
+
+
+async def _handle_get_email_path(arguments: dict) -> dict:
+    """Tool 1: Get single email path"""
+    message_id = arguments["message_id"]
+    file_path = await asyncio.to_thread(get_single_email_path, message_id)
+
+    if not file_path:
+        return {
+            "success": False,
+            "message_id": message_id,
+            "error": "Email file not found",
+            "possible_reasons": [
+                "Message-ID does not exist",
+                "Email file has been deleted",
+                "Email is in a different Mail database version"
+            ]
+        }
+
+    return {
+        "success": True,
+        "message_id": message_id,
+        "file_path": file_path
+    }
+
+
+async def _handle_get_thread_paths(arguments: dict) -> dict:
+    """Tool 2: Get all paths in thread"""
+    message_id = arguments["message_id"]
+    entries = await asyncio.to_thread(get_thread_entries, message_id)
+
+    if not entries:
+        return {
+            "success": False,
+            "message_id": message_id,
+            "error": "Email thread not found or thread has no email files"
+        }
+
+    paths = [path for _, path in entries]
+
+    return {
+        "success": True,
+        "message_id": message_id,
+        "thread_size": len(paths),
+        "file_paths": paths
+    }
+
+
+async def _handle_read_email(arguments: dict) -> dict:
+    """Tool 3: Parse and read email content"""
+    message_id = arguments["message_id"]
+    max_body_length = arguments.get("max_body_length")
+
+    # First get file path
+    file_path = await asyncio.to_thread(get_single_email_path, message_id)
+
+    if not file_path:
+        return {
+            "success": False,
+            "message_id": message_id,
+            "error": "Email file not found"
+        }
+
+    # Parse email file with optional body length limit
+    return await asyncio.to_thread(
+        parse_email_cached,
+        file_path,
+        max_body_length=max_body_length,
+        headers_only=arguments.get("headers_only", False)
+    )
+
+
+async def _handle_read_thread(arguments: dict) -> list:
+    """
+    Tool 4: Parse and read entire email thread
+
+    Returns a summary item followed by one item per email, each sent as
+    its own TextContent so no single JSON document holds the whole thread.
+    """
+    message_id = arguments["message_id"]
+    max_body_length = arguments.get("max_body_length")
+
+    # Get max_body_length from environment if not specified
+    if max_body_length is None:
+        max_body_length = int(os.environ.get('MAIL_THREAD_MAX_BODY_LENGTH', '1200'))
+
+    # Get all emails in thread (also primes get_email_path for each of them)
+    entries = await asyncio.to_thread(get_thread_entries, message_id)
+
+    if not entries:
+        return {
+            "success": False,
+            "message_id": message_id,
+            "error": "Email thread not found or thread has no email files"
+        }
+
+    # Parse all emails with smart quote stripping
+    # For threads, we enable quote stripping to remove redundant quoted content
+    # A bounded set of workers pulls emails from a shared iterator and parses
+    # them on worker threads; results are stored by index to keep chronological order
+    emails = [None] * len(entries)
+    pending = iter(enumerate(entries))
+
+    async def worker():
+        for index, (_, path) in pending:
+            emails[index] = await asyncio.to_thread(
+                parse_email_cached,
+                path,
+                max_body_length=max_body_length,
+                strip_quotes=True  # Enable smart quote removal for threads
+            )
+
+    workers = min(THREAD_PARSE_CONCURRENCY, len(entries))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+    return [
+        {
+            "success": True,
+            "message_id": message_id,
+            "thread_size": len(emails)
+        },
+        *emails
     ]
 
 
+async def _handle_extract_attachments(arguments: dict) -> dict:
+    """Tool 5: Extract attachments from email"""
+    message_id = arguments["message_id"]
+    filenames = arguments["filenames"]
+
+    # First get file path
+    file_path = await asyncio.to_thread(get_single_email_path, message_id)
+
+    if not file_path:
+        return {
+            "success": False,
+            "message_id": message_id,
+            "error": "Email file not found"
+        }
+
+    # Extract attachments
+    return await asyncio.to_thread(extract_attachments, file_path, message_id, filenames)
+
+
+async def _handle_cleanup_attachments(arguments: dict) -> dict:
+    """Tool 6: Clean up attachment directories"""
+    return await asyncio.to_thread(
+        cleanup_attachments,
+        arguments["message_ids"],
+        compute_stats=arguments.get("compute_stats", False)
+    )
+
+
+# Tool name -> (handler, required parameters)
+HANDLERS = {
+    "get_email_path": (_handle_get_email_path, ("message_id",)),
+    "get_thread_paths": (_handle_get_thread_paths, ("message_id",)),
+    "read_email": (_handle_read_email, ("message_id",)),
+    "read_thread": (_handle_read_thread, ("message_id",)),
+    "extract_attachments": (_handle_extract_attachments, ("message_id", "filenames")),
+    "cleanup_attachments": (_handle_cleanup_attachments, ("message_ids",)),
+}
+
+
+def _dumps(result) -> str:
+    """Serialize a tool result as indented JSON, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def _text(text: str) -> list[TextContent]:
+    """Wrap a string as a single MCP text response"""
+    return [TextContent(type="text", text=text)]
+
+
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Handle tool calls"""
+    entry = HANDLERS.get(name)
 
-    if name == "get_email_path":
-        # Tool 1: Get single email path
-        message_id = arguments.get("message_id")
+    if entry is None:
+        return _text(f"Error: Unknown tool '{name}'")
 
-        if not message_id:
-            return [TextContent(
-                type="text",
-                text="Error: Missing message_id parameter"
-            )]
+    handler, required = entry
 
-        try:
-            file_path = get_single_email_path(message_id)
+    for param in required:
+        if not arguments.get(param):
+            return _text(f"Error: Missing {param} parameter")
 
-            if file_path:
-                result = {
-                    "success": True,
-                    "message_id": message_id,
-                    "file_path": file_path
-                }
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(result, ensure_ascii=False, indent=2)
-                )]
-            else:
-                result = {
-                    "success": False,
-                    "message_id": message_id,
-                    "error": "Email file not found",
-                    "possible_reasons": [
-                        "Message-ID does not exist",
-                        "Email file has been deleted",
-                        "Email is in a different Mail database version"
-                    ]
-                }
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(result, ensure_ascii=False, indent=2)
-                )]
-
-        except Exception as e:
-            result = {
-                "success": False,
-                "message_id": message_id,
-                "error": str(e)
-            }
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, ensure_ascii=False, indent=2)
-            )]
-
-    elif name == "get_thread_paths":
-        # Tool 2: Get all paths in thread
-        message_id = arguments.get("message_id")
-
-        if not message_id:
-            return [TextContent(
-                type="text",
-                text="Error: Missing message_id parameter"
-            )]
-
-        try:
-            paths = get_all_thread_paths(message_id, include_not_found=False)
-
-            if paths:
-                result = {
-                    "success": True,
-                    "message_id": message_id,
-                    "thread_size": len(paths),
-                    "file_paths": paths
-                }
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(result, ensure_ascii=False, indent=2)
-                )]
-            else:
-                result = {
-                    "success": False,
-                    "message_id": message_id,
-                    "error": "Email thread not found or thread has no email files"
-                }
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(result, ensure_ascii=False, indent=2)
-                )]
-
-        except Exception as e:
-            result = {
-                "success": False,
-                "message_id": message_id,
-                "error": str(e)
-            }
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, ensure_ascii=False, indent=2)
-            )]
-
-    elif name == "read_email":
-        # Tool 3: Parse and read email content
-        message_id = arguments.get("message_id")
-        max_body_length = arguments.get("max_body_length")
-
-        if not message_id:
-            return [TextContent(
-                type="text",
-                text="Error: Missing message_id parameter"
-            )]
-
-        try:
-            # First get file path
-            file_path = get_single_email_path(message_id)
-
-            if not file_path:
-                result = {
-                    "success": False,
-                    "message_id": message_id,
-                    "error": "Email file not found"
-                }
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(result, ensure_ascii=False, indent=2)
-                )]
-
-            # Parse email file with optional body length limit
-            email_data = parse_email_file(file_path, max_body_length=max_body_length)
-
-            return [TextContent(
-                type="text",
-                text=json.dumps(email_data, ensure_ascii=False, indent=2)
-            )]
-
-        except Exception as e:
-            result = {
-                "success": False,
-                "message_id": message_id,
-                "error": str(e)
-            }
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, ensure_ascii=False, indent=2)
-            )]
-
-    elif name == "read_thread":
-        # Tool 4: Parse and read entire email thread
-        message_id = arguments.get("message_id")
-        max_body_length = arguments.get("max_body_length")
-
-        if not message_id:
-            return [TextContent(
-                type="text",
-                text="Error: Missing message_id parameter"
-            )]
-
-        try:
-            # Get max_body_length from environment if not specified
-            if max_body_length is None:
-                import os
-                max_body_length = int(os.environ.get('MAIL_THREAD_MAX_BODY_LENGTH', '1200'))
-
-            # Get all email paths in thread
-            paths = get_all_thread_paths(message_id, include_not_found=False)
-
-            if not paths:
-                result = {
-                    "success": False,
-                    "message_id": message_id,
-                    "error": "Email thread not found or thread has no email files"
-                }
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(result, ensure_ascii=False, indent=2)
-                )]
-
-            # Parse all emails with smart quote stripping
-            # For threads, we enable quote stripping to remove redundant quoted content
-            emails = []
-            for path in paths:
-                email_data = parse_email_file(
-                    path,
-                    max_body_length=max_body_length,
-                    strip_quotes=True  # Enable smart quote removal for threads
-                )
-                emails.append(email_data)
-
-            result = {
-                "success": True,
-                "message_id": message_id,
-                "thread_size": len(emails),
-                "emails": emails
-            }
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, ensure_ascii=False, indent=2)
-            )]
-
-        except Exception as e:
-            result = {
-                "success": False,
-                "message_id": message_id,
-                "error": str(e)
-            }
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, ensure_ascii=False, indent=2)
-            )]
-
-    elif name == "extract_attachments":
-        # Tool 5: Extract attachments from email
-        message_id = arguments.get("message_id")
-        filenames = arguments.get("filenames")
-
-        if not message_id:
-            return [TextContent(
-                type="text",
-                text="Error: Missing message_id parameter"
-            )]
-
-        if not filenames:
-            return [TextContent(
-                type="text",
-                text="Error: Missing filenames parameter"
-            )]
-
-        try:
-            # First get file path
-            file_path = get_single_email_path(message_id)
-
-            if not file_path:
-                result = {
-                    "success": False,
-                    "message_id": message_id,
-                    "error": "Email file not found"
-                }
-                return [TextContent(
-                    type="text",
-                    text=json.dumps(result, ensure_ascii=False, indent=2)
-                )]
-
-            # Extract attachments
-            extract_result = extract_attachments(file_path, message_id, filenames)
-
-            return [TextContent(
-                type="text",
-                text=json.dumps(extract_result, ensure_ascii=False, indent=2)
-            )]
-
-        except Exception as e:
-            result = {
-                "success": False,
-                "message_id": message_id,
-                "error": str(e)
-            }
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, ensure_ascii=False, indent=2)
-            )]
-
-    elif name == "cleanup_attachments":
-        # Tool 6: Clean up attachment directories
-        message_ids = arguments.get("message_ids")
-
-        if not message_ids:
-            return [TextContent(
-                type="text",
-                text="Error: Missing message_ids parameter"
-            )]
-
-        try:
-            cleanup_result = cleanup_attachments(message_ids)
-
-            return [TextContent(
-                type="text",
-                text=json.dumps(cleanup_result, ensure_ascii=False, indent=2)
-            )]
-
-        except Exception as e:
-            result = {
-                "success": False,
-                "error": str(e)
-            }
-            return [TextContent(
-                type="text",
-                text=json.dumps(result, ensure_ascii=False, indent=2)
-            )]
-
-    else:
-        return [TextContent(
-            type="text",
-            text=f"Error: Unknown tool '{name}'"
-        )]
+    try:
+        result = await handler(arguments)
+
+        if isinstance(result, list):
+            # Multi-part response (read_thread): one TextContent per item
+            return [TextContent(type="text", text=_dumps(item)) for item in result]
+
+        return _text(_dumps(result))
+    except Exception as e:
+        error = {"success": False}
+        if "message_id" in arguments:
+            error["message_id"] = arguments["message_id"]
+        error["error"] = str(e)
+        return _text(_dumps(error))
 
 
 async def main():
     """Start MCP server"""
+    asyncio.get_running_loop().set_default_executor(executor)
+
     async with stdio_server() as (read_stream, write_stream):
         await app.run(
             read_stream,
@@ -473,5 +446,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -5,54 +5,23 @@ Parse .emlx email files and extract plain text content
 Focus on plain text email parsing, return structured data for AI analysis
 """
 
-import email
-import email.policy
-from email.header import decode_header
 from pathlib import Path
 from typing import Dict, Optional, Any
-import base64
-import quopri
 import os
 import sys
 
 # Import quote stripper
 sys.path.insert(0, str(Path(__file__).parent))
 from quote_stripper import strip_email_quotes
-
-
-def decode_header_value(value: str) -> str:
-    """
-    Decode encoded email header values (e.g. =?utf-8?B?...?=)
-
-    Args:
-        value: Encoded header value
-
-    Returns:
-        Decoded string
-    """
-    if not value:
-        return ""
-
-    decoded_parts = []
-    for content, encoding in decode_header(value):
-        if isinstance(content, bytes):
-            if encoding:
-                try:
-                    decoded_parts.append(content.decode(encoding))
-                except (LookupError, UnicodeDecodeError):
-                    decoded_parts.append(content.decode('utf-8', errors='replace'))
-            else:
-                decoded_parts.append(content.decode('utf-8', errors='replace'))
-        else:
-            decoded_parts.append(str(content))
-
-    return ''.join(decoded_parts)
+from _mime_utils import read_emlx_body
+from _parser_backend import parse_bytes
 
 
 def parse_email_file(
     file_path: str,
     max_body_length: Optional[int] = None,
-    strip_quotes: bool = False
+    strip_quotes: bool = False,
+    headers_only: bool = False
 ) -> Dict[str, Any]:
     """
     Parse .emlx file and extract plain text content
@@ -64,6 +33,8 @@ def parse_email_file(
                         0 = unlimited
         strip_quotes: Enable smart quote stripping (for thread reading).
                      Keeps new content + first N lines of quotes
+        headers_only: Skip body decoding; body_text is "" and attachment
+                     sizes are computed from the encoded payload
 
     Returns:
         Dictionary containing email information:
@@ -98,112 +69,20 @@ def parse_email_file(
         }
 
     try:
-        # Read email content
-        with open(file_path_obj, 'rb') as f:
-            lines = f.readlines()
-
-        # .emlx file format:
-        # First line: file size
-        # Second line onwards: raw email content
-        # Last few lines: Apple plist metadata (XML)
-
-        # Skip first line (size info)
-        if len(lines) < 2:
+        # Read email content (size line and plist metadata are skipped)
+        try:
+            raw_content = read_emlx_body(file_path_obj)
+        except ValueError as e:
             return {
                 "success": False,
-                "error": "Invalid file format or empty file"
+                "error": str(e)
             }
 
-        # From second line, find plist start position
-        email_lines = []
-        for line in lines[1:]:  # Skip first line
-            line_str = line.decode('utf-8', errors='ignore')
-            # Detect plist start marker
-            if '<?xml version' in line_str or '<!DOCTYPE plist' in line_str or '<plist version' in line_str:
-                break
-            email_lines.append(line)
-
-        raw_content = b''.join(email_lines)
-
-        # Parse email - use compat32 for old format, default for new format
-        msg = email.message_from_bytes(raw_content, policy=email.policy.compat32)
-
-        # Extract basic header info
-        message_id = msg.get('Message-Id', '')
-        subject = decode_header_value(msg.get('Subject', ''))
-        from_addr = decode_header_value(msg.get('From', ''))
-        to_addr = decode_header_value(msg.get('To', ''))
-        cc_addr = decode_header_value(msg.get('Cc', ''))
-        date = msg.get('Date', '')
-
-        # Extract threading-related headers (important for conversation analysis)
-        references = msg.get('References', '')
-        in_reply_to = msg.get('In-Reply-To', '')
-
-        # Extract attachments metadata
-        attachments = []
-
-        # Extract body
-        body_text = ""
-
-        if msg.is_multipart():
-            # multipart email - find text/plain part and collect attachments
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get('Content-Disposition', ''))
-
-                # Check for attachment
-                # An attachment can be identified by:
-                # 1. Content-Disposition contains 'attachment'
-                # 2. Has a filename but is NOT a text/plain or text/html part
-                is_attachment = (
-                    'attachment' in content_disposition or
-                    (part.get_filename() and content_type not in ['text/plain', 'text/html'])
-                )
-
-                if is_attachment:
-                    # Extract attachment metadata
-                    filename = part.get_filename()
-
-                    if filename:
-                        # Decode filename if encoded
-                        filename = decode_header_value(filename)
-
-                        # Get attachment size by decoding payload
-                        payload = part.get_payload(decode=True)
-                        size_bytes = len(payload) if payload else 0
-
-                        attachments.append({
-                            "filename": filename,
-                            "mime_type": content_type,
-                            "size_bytes": size_bytes
-                        })
-                    # Don't continue - check if this is also text/plain
-                elif content_type == 'text/plain' and not body_text:
-                    # Found plain text part (only take the first one)
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        # Try to decode
-                        charset = part.get_content_charset() or 'utf-8'
-                        try:
-                            body_text = payload.decode(charset)
-                        except (UnicodeDecodeError, LookupError):
-                            # Fallback to utf-8
-                            body_text = payload.decode('utf-8', errors='replace')
-        else:
-            # Single part email - extract directly
-            content_type = msg.get_content_type()
-            if content_type == 'text/plain':
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    charset = msg.get_content_charset() or 'utf-8'
-                    try:
-                        body_text = payload.decode(charset)
-                    except (UnicodeDecodeError, LookupError):
-                        body_text = payload.decode('utf-8', errors='replace')
-            else:
-                # Non text/plain, try to get payload directly
-                body_text = str(msg.get_payload())
+        parsed = parse_bytes(raw_content, headers_only=headers_only)
+        if headers_only:
+            return {"success": True, **parsed}
+
+        body_text = parsed["body_text"]
 
         # Handle body processing
         body_text = body_text.strip()
@@ -236,16 +115,8 @@ def parse_email_file(
 
         result = {
             "success": True,
-            "message_id": message_id,
-            "subject": subject,
-            "from": from_addr,
-            "to": to_addr,
-            "cc": cc_addr,
-            "date": date,
-            "references": references,
-            "in_reply_to": in_reply_to,
-            "body_text": body_text,
-            "attachments": attachments
+            **parsed,
+            "body_text": body_text
         }
 
         # Add truncation metadata if truncated
@@ -269,10 +140,21 @@ def parse_email_file(
         }
 
 
+def parse_email_headers(file_path: str) -> Dict[str, Any]:
+    """
+    Parse only the headers and attachment list of an .emlx file
+
+    Args:
+        file_path: Absolute path to .emlx file
+
+    Returns:
+        Same dictionary as parse_email_file, with an empty body_text
+    """
+    return parse_email_file(file_path, headers_only=True)
+
+
 def main():
     """Command line test tool"""
-    import sys
-
     if len(sys.argv) < 2:
         print("Usage: python3 parse_email.py <emlx_file_path>")
         print("\nExample:")
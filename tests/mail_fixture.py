@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Temporary Mail V10 tree (Envelope Index + .emlx files) for tests
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import _db
+import get_email_path
+
+
+SCHEMA = """
+CREATE TABLE messages (
+    ROWID INTEGER PRIMARY KEY, global_message_id INTEGER, mailbox INTEGER,
+    conversation_id INTEGER, date_sent INTEGER, remote_id INTEGER
+);
+CREATE TABLE message_global_data (ROWID INTEGER PRIMARY KEY, message_id_header TEXT);
+CREATE TABLE mailboxes (ROWID INTEGER PRIMARY KEY, url TEXT);
+"""
+
+# Indexes that make Message-ID lookups use SEARCH instead of SCAN
+INDEXES = """
+CREATE INDEX mgd_message_id_header ON message_global_data(message_id_header);
+CREATE INDEX messages_global_message_id ON messages(global_message_id);
+"""
+
+PLIST = b'<?xml version="1.0" encoding="UTF-8"?>\n<plist version="1.0"><dict/></plist>\n'
+
+
+def reset_lookup_state():
+    """Drop every cache, connection and side index of the lookup modules"""
+    _db.reset_connections()
+    get_email_path.invalidate()
+    get_email_path._mbox_index.clear()
+    get_email_path._store_dir_cache.clear()
+    get_email_path._mailbox_dir.cache_clear()
+    get_email_path._plan_checked = False
+    get_email_path._side_index_max = None
+    get_email_path._db_mtime = None
+    if get_email_path._side_index_conn is not None:
+        get_email_path._side_index_conn.close()
+        get_email_path._side_index_conn = None
+
+
+class MailFixture:
+    """
+    A Mail V10 directory with an Envelope Index, active for one test
+
+    Args:
+        testcase: unittest.TestCase; patches and the temp directory are
+                  undone through its addCleanup
+        indexed: Create the Message-ID indexes; without them lookups
+                 scan, and the in-memory side index is built
+    """
+
+    def __init__(self, testcase, indexed=True):
+        tmp = tempfile.TemporaryDirectory()
+        testcase.addCleanup(tmp.cleanup)
+
+        self.v10 = Path(tmp.name) / "V10"
+        self.db_path = self.v10 / "MailData" / "Envelope Index"
+        self.db_path.parent.mkdir(parents=True)
+
+        db = sqlite3.connect(self.db_path)
+        db.executescript(SCHEMA + (INDEXES if indexed else ""))
+        db.commit()
+        db.close()
+
+        for target, name, value in (
+            (_db, "MAIL_DB_PATH", self.db_path),
+            (get_email_path, "MAIL_DB_PATH", self.db_path),
+            (get_email_path, "MAIL_V10_PATH", self.v10),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            testcase.addCleanup(patcher.stop)
+
+        reset_lookup_state()
+        testcase.addCleanup(reset_lookup_state)
+
+    def add_message(self, rowid, message_id, mailbox_url, conversation_id, date_sent=0):
+        """Insert one message (and its mailbox) into the Envelope Index"""
+        db = sqlite3.connect(self.db_path)
+        mailbox = db.execute("SELECT ROWID FROM mailboxes WHERE url = ?", (mailbox_url,)).fetchone()
+        if mailbox is None:
+            mailbox = (db.execute("INSERT INTO mailboxes (url) VALUES (?)", (mailbox_url,)).lastrowid,)
+        global_id = db.execute(
+            "INSERT INTO message_global_data (message_id_header) VALUES (?)", (message_id,)
+        ).lastrowid
+        db.execute(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?, 0)",
+            (rowid, global_id, mailbox[0], conversation_id, date_sent)
+        )
+        db.commit()
+        db.close()
+
+    def write_emlx(self, relative_path, raw=b"Subject: test\n\nbody\n"):
+        """
+        Write an .emlx file below the V10 directory
+
+        Args:
+            relative_path: e.g. "ACCOUNT/INBOX.mbox/UUID/Data/Messages/5.emlx"
+            raw: Raw email bytes
+
+        Returns:
+            str: Absolute path of the file
+        """
+        path = self.v10 / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"%d\n" % len(raw) + raw + PLIST)
+        return str(path)
+
+
+def touch_later(path):
+    """Move a file's modification time forward so mtime checks notice it"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
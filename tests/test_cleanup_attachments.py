@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Regression tests for cleanup_attachments
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from cleanup_attachments import cleanup_attachments
+
+
+class DuplicateIdTests(unittest.TestCase):
+    """IDs that map to the same directory must remove it exactly once"""
+
+    def test_bracketed_and_bare_id(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            for _ in range(30):
+                message_dir = os.path.join(base_dir, "m@x")
+                os.makedirs(message_dir)
+                with open(os.path.join(message_dir, "a.txt"), "w") as f:
+                    f.write("data")
+
+                result = cleanup_attachments(["m@x", "<m@x>"], base_dir=base_dir)
+
+                self.assertTrue(result["success"], result)
+                self.assertEqual([e["message_id"] for e in result["cleaned"]], ["m@x"])
+                self.assertEqual(result["not_found"], ["<m@x>"])
+                self.assertFalse(os.path.exists(message_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
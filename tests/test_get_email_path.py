@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Tests for locating .emlx files in get_email_path
+"""
+
+import io
+import sys
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from mail_fixture import MailFixture, touch_later
+import get_email_path
+import get_thread_paths
+
+
+INBOX = "imap://ACCOUNT/INBOX"
+STORE = "ACCOUNT/INBOX.mbox/UUID/Data"
+
+
+class BucketDirTests(unittest.TestCase):
+
+    def test_reversed_thousands_digits(self):
+        self.assertEqual(get_email_path._bucket_dir(5), "Messages")
+        self.assertEqual(get_email_path._bucket_dir(999), "Messages")
+        self.assertEqual(get_email_path._bucket_dir(1000), "1/Messages")
+        self.assertEqual(get_email_path._bucket_dir(12345), "2/1/Messages")
+        self.assertEqual(get_email_path._bucket_dir(123456), "3/2/1/Messages")
+
+
+class FindEmlxTests(unittest.TestCase):
+
+    def setUp(self):
+        self.mail = MailFixture(self)
+        self.mbox = get_email_path._mailbox_dir(INBOX)
+
+        self.real_index = get_email_path._index_mbox
+        walk = mock.patch.object(get_email_path, "_index_mbox", wraps=self.real_index)
+        self.index_mbox = walk.start()
+        self.addCleanup(walk.stop)
+
+    def test_bucket_hit(self):
+        path = self.mail.write_emlx(f"{STORE}/3/2/1/Messages/123456.emlx")
+
+        self.assertEqual(get_email_path.resolve_email_file(123456, INBOX), path)
+        self.index_mbox.assert_not_called()
+
+    def test_partial_bucket_hit(self):
+        path = self.mail.write_emlx(f"{STORE}/2/1/Messages/12345.partial.emlx")
+
+        self.assertEqual(get_email_path.resolve_email_file(12345, INBOX), path)
+        self.index_mbox.assert_not_called()
+
+    def test_walk_fallback(self):
+        # Not where the bucket scheme puts ROWID 777
+        path = self.mail.write_emlx(f"{STORE}/9/Messages/777.emlx")
+
+        self.assertEqual(get_email_path.resolve_email_file(777, INBOX), path)
+        self.assertEqual(self.index_mbox.call_count, 1)
+
+    def test_nested_mailboxes_and_attachments_are_skipped(self):
+        self.mail.write_emlx("ACCOUNT/INBOX.mbox/Child.mbox/UUID2/Data/Messages/888.emlx")
+        self.mail.write_emlx(f"{STORE}/Attachments/889/2/889.emlx")
+        own = self.mail.write_emlx(f"{STORE}/Messages/890.emlx")
+
+        self.assertEqual(get_email_path._index_mbox(self.mbox), {890: own})
+        self.assertIsNone(get_email_path.resolve_email_file(888, INBOX))
+        self.assertIsNone(get_email_path.resolve_email_file(889, INBOX))
+
+    def test_concurrent_misses_walk_once(self):
+        self.mail.write_emlx(f"{STORE}/Messages/5.emlx")
+
+        def slow_index(mbox_path):
+            # Keep the walk running while the other lookups arrive
+            time.sleep(0.1)
+            return self.real_index(mbox_path)
+
+        self.index_mbox.side_effect = slow_index
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda rowid: get_email_path.resolve_email_file(rowid, INBOX),
+                range(900001, 900009)
+            ))
+
+        self.assertEqual(results, [None] * 8)
+        self.assertEqual(self.index_mbox.call_count, 1)
+
+
+class SideIndexTests(unittest.TestCase):
+    """EXPLAIN QUERY PLAN decides whether the in-memory Message-ID index is used"""
+
+    def _setup(self, indexed):
+        self.mail = MailFixture(self, indexed=indexed)
+        self.mail.add_message(5, "<a@x>", INBOX, 100)
+        self.mail.add_message(6, "<b@x>", INBOX, 100)
+
+        stderr = mock.patch.object(sys, "stderr", io.StringIO())
+        self.stderr = stderr.start()
+        self.addCleanup(stderr.stop)
+
+    def _lookup(self, message_id):
+        return get_email_path.execute_by_mid(
+            get_email_path._SQL_FIND_BY_MID, get_email_path._SQL_FIND_BY_MID_INDEXED, message_id
+        ).fetchall()
+
+    def _attached(self):
+        conn = get_email_path.get_conn()
+        return [row[1] for row in conn.execute("PRAGMA database_list")]
+
+    def test_scan_plan_attaches_side_index(self):
+        self._setup(indexed=False)
+
+        self.assertEqual(self._lookup("<a@x>"), [(5, INBOX)])
+        self.assertIn("scan the Mail database", self.stderr.getvalue())
+        self.assertEqual(get_email_path._side_index_max, 6)
+        self.assertIn("mid_index", self._attached())
+
+    def test_rows_after_snapshot_are_found(self):
+        self._setup(indexed=False)
+        self._lookup("<a@x>")
+
+        self.mail.add_message(7, "<new@x>", INBOX, 200)
+
+        conn = get_email_path.get_conn()
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM mid_index.mid_map WHERE message_id_header = '<new@x>'")
+            .fetchone()[0],
+            0
+        )
+        self.assertEqual(self._lookup("<new@x>"), [(7, INBOX)])
+        self.assertEqual(self._lookup("<b@x>"), [(6, INBOX)])
+
+    def test_indexed_plan_uses_plain_query(self):
+        self._setup(indexed=True)
+
+        self.assertEqual(self._lookup("<a@x>"), [(5, INBOX)])
+        self.assertEqual(self.stderr.getvalue(), "")
+        self.assertIsNone(get_email_path._side_index_max)
+        self.assertNotIn("mid_index", self._attached())
+
+
+class NegativeCacheTests(unittest.TestCase):
+    """Misses are remembered for _NEG_CACHE_TTL seconds and dropped on invalidation"""
+
+    def setUp(self):
+        self.mail = MailFixture(self)
+        self.now = 1000.0
+
+        clock = mock.patch.object(get_email_path.time, "monotonic", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+        resolve = mock.patch.object(get_email_path, "_resolve", side_effect=LookupError)
+        self.resolve = resolve.start()
+        self.addCleanup(resolve.stop)
+
+    def test_miss_is_retried_after_ttl(self):
+        self.assertIsNone(get_email_path.get_email_path("<gone@x>"))
+        self.now += get_email_path._NEG_CACHE_TTL - 1
+        self.assertIsNone(get_email_path.get_email_path("<gone@x>"))
+        self.assertEqual(self.resolve.call_count, 1)
+
+        self.now += 1
+        self.assertIsNone(get_email_path.get_email_path("<gone@x>"))
+        self.assertEqual(self.resolve.call_count, 2)
+
+    def test_invalidate_clears_misses(self):
+        get_email_path.get_email_path("<gone@x>")
+        get_email_path.invalidate()
+        get_email_path.get_email_path("<gone@x>")
+        self.assertEqual(self.resolve.call_count, 2)
+
+    def test_size_is_bounded_and_expired_entries_pruned(self):
+        with mock.patch.object(get_email_path, "_NEG_CACHE_SIZE", 3):
+            for i in range(5):
+                get_email_path.get_email_path(f"<gone{i}@x>")
+            self.assertEqual(list(get_email_path._neg_cache), ["<gone2@x>", "<gone3@x>", "<gone4@x>"])
+
+        self.now += get_email_path._NEG_CACHE_TTL
+        get_email_path.get_email_path("<late@x>")
+        self.assertEqual(list(get_email_path._neg_cache), ["<late@x>"])
+
+
+class DbMtimeInvalidationTests(unittest.TestCase):
+    """Writes to the Mail database or its WAL clear every lookup cache"""
+
+    def setUp(self):
+        self.mail = MailFixture(self)
+        self.mail.add_message(5, "<a@x>", INBOX, 100)
+        self.mail.add_message(6, "<b@x>", INBOX, 100)
+        self.mail.write_emlx(f"{STORE}/Messages/5.emlx")
+        self.mail.write_emlx(f"{STORE}/Messages/6.emlx")
+
+    def _fill_caches(self):
+        self.assertIsNotNone(get_email_path.get_email_path("<a@x>"))
+        self.assertEqual(get_thread_paths.get_conversation_id("<a@x>"), 100)
+        get_thread_paths.get_thread_entries("<b@x>")
+
+        self.assertEqual(get_email_path._resolve.cache_info().currsize, 1)
+        self.assertEqual(get_thread_paths._conversation_id.cache_info().currsize, 1)
+        self.assertEqual(get_email_path._mailbox_dir.cache_info().currsize, 1)
+        self.assertIn("<b@x>", get_email_path._path_cache)
+
+    def _assert_caches_empty(self):
+        self.assertEqual(get_email_path._resolve.cache_info().currsize, 0)
+        self.assertEqual(get_thread_paths._conversation_id.cache_info().currsize, 0)
+        self.assertEqual(get_email_path._mailbox_dir.cache_info().currsize, 0)
+        self.assertEqual(get_email_path._path_cache, {})
+
+    def test_unchanged_database_keeps_caches(self):
+        self._fill_caches()
+        get_email_path.check_db_mtime()
+        self.assertEqual(get_email_path._resolve.cache_info().currsize, 1)
+
+    def test_database_mtime_change_clears_caches(self):
+        self._fill_caches()
+        touch_later(self.mail.db_path)
+        get_email_path.check_db_mtime()
+        self._assert_caches_empty()
+
+    def test_wal_mtime_change_clears_caches(self):
+        wal = f"{self.mail.db_path}-wal"
+        open(wal, "wb").close()
+        self._fill_caches()
+
+        touch_later(wal)
+        get_email_path.check_db_mtime()
+        self._assert_caches_empty()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for thread lookups in get_thread_paths
+"""
+
+import unittest
+
+from mail_fixture import MailFixture
+import get_thread_paths
+
+
+INBOX = "imap://ACCOUNT/INBOX"
+
+
+class ThreadPathsBulkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.mail = MailFixture(self)
+        # Thread 100: two emails; thread 200: one email whose file is missing
+        self.mail.add_message(5, "<a@x>", INBOX, 100, date_sent=20)
+        self.mail.add_message(6, "<b@x>", INBOX, 100, date_sent=10)
+        self.mail.add_message(7, "<c@x>", INBOX, 200)
+        self.a = self.mail.write_emlx("ACCOUNT/INBOX.mbox/UUID/Data/Messages/5.emlx")
+        self.b = self.mail.write_emlx("ACCOUNT/INBOX.mbox/UUID/Data/Messages/6.emlx")
+
+    def test_matches_single_thread_lookups(self):
+        results = get_thread_paths.get_thread_paths_bulk(["a@x", "<b@x>", "<c@x>", "<nope@x>"])
+
+        self.assertEqual(results, {
+            "<a@x>": [self.b, self.a],
+            "<b@x>": [self.b, self.a],
+            "<c@x>": [],
+            "<nope@x>": [],
+        })
+        for message_id in ("<a@x>", "<c@x>"):
+            self.assertEqual(results[message_id], get_thread_paths.get_thread_paths(message_id))
+
+    def test_include_not_found(self):
+        results = get_thread_paths.get_thread_paths_bulk(["<c@x>"], include_not_found=True)
+        self.assertEqual(results, {"<c@x>": [None]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Regression tests for .emlx slicing
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from _mime_utils import _slice_email
+
+
+PLIST = b'<?xml version="1.0"?>\n<plist version="1.0"></plist>\n'
+
+
+class SliceEmailTests(unittest.TestCase):
+
+    def test_no_trailing_newline(self):
+        raw = b"Subject: hi\n\nbody line"
+        data = b"%d\n" % len(raw) + raw + PLIST
+        self.assertEqual(_slice_email(data), raw)
+
+    def test_malformed_length_falls_back_to_markers(self):
+        raw = b"Subject: hi\n\nbody line\n"
+        data = b"garbage\n" + raw + PLIST
+        self.assertEqual(_slice_email(data), raw)
+
+
+if __name__ == "__main__":
+    unittest.main()
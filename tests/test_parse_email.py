@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Regression tests for parse_email_file
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from parse_email import parse_email_file
+
+
+PLIST = b'<?xml version="1.0" encoding="UTF-8"?>\n<plist version="1.0">\n<dict/>\n</plist>\n'
+
+
+def write_emlx(directory, raw):
+    """Write raw email bytes as an .emlx file and return its path"""
+    path = os.path.join(directory, "1.emlx")
+    with open(path, "wb") as f:
+        f.write(b"%d\n" % len(raw) + raw + PLIST)
+    return path
+
+
+class MalformedHeaderTests(unittest.TestCase):
+    """Headers the default policy cannot parse must not fail the whole email"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def _parse(self, headers, **kwargs):
+        raw = b"Subject: hello\n" + headers + b"Content-Type: text/plain\n\nbody line\n"
+        return parse_email_file(write_emlx(self._tmp.name, raw), **kwargs)
+
+    def test_malformed_message_id(self):
+        for headers_only in (False, True):
+            result = self._parse(b"Message-Id: <<<>>\n", headers_only=headers_only)
+            self.assertTrue(result["success"], result)
+            self.assertEqual(result["subject"], "hello")
+            self.assertEqual(result["message_id"], "<<<>>")
+        self.assertEqual(self._parse(b"Message-Id: <<<>>\n")["body_text"], "body line")
+
+    def test_malformed_addresses(self):
+        for headers_only in (False, True):
+            result = self._parse(b"From: a@\nTo: @\nCc: <a@b\n", headers_only=headers_only)
+            self.assertTrue(result["success"], result)
+            self.assertEqual(result["subject"], "hello")
+            self.assertEqual(result["from"], "a@")
+        self.assertEqual(self._parse(b"From: a@\nTo: @\nCc: <a@b\n")["body_text"], "body line")
+
+
+if __name__ == "__main__":
+    unittest.main()
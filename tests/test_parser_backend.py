@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests for the email parsing backends
+"""
+
+import base64
+import email
+import email.policy
+import io
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import _parser_backend
+
+
+class StubParseError(Exception):
+    pass
+
+
+def stub_module(parse_email):
+    """Stand-in for the fast_mail_parser package"""
+    return SimpleNamespace(parse_email=parse_email, ParseError=StubParseError)
+
+
+class FastBackendTests(unittest.TestCase):
+
+    def setUp(self):
+        mail = SimpleNamespace(
+            subject="Hello",
+            headers={
+                "Message-ID": ["<a@x>"],
+                "From": ["Alice <a@example.com>"],
+                "To": ["Bob <b@example.com>"],
+                "Cc": [],
+                "Date": ["Mon, 1 Jan 2024 10:00:00 +0000"],
+                "In-Reply-To": ["<root@x>", "<ignored@x>"],
+            },
+            text_plain=["line one\r\nline two\r\n"],
+            attachments=[
+                SimpleNamespace(filename="report.pdf", mimetype="application/pdf", content=b"12345"),
+                SimpleNamespace(filename="", mimetype="image/png", content=b"x"),
+            ],
+        )
+        self.calls = []
+
+        def parse_email(raw):
+            self.calls.append(raw)
+            return mail
+
+        patcher = mock.patch.object(_parser_backend, "fast_mail_parser", stub_module(parse_email))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_field_mapping(self):
+        result = _parser_backend._parse_fast(b"raw")
+
+        self.assertEqual(self.calls, [b"raw"])
+        self.assertEqual(result["message_id"], "<a@x>")
+        self.assertEqual(result["subject"], "Hello")
+        self.assertEqual(result["from"], "Alice <a@example.com>")
+        self.assertEqual(result["to"], "Bob <b@example.com>")
+        self.assertEqual(result["cc"], "")
+        self.assertEqual(result["date"], "Mon, 1 Jan 2024 10:00:00 +0000")
+        self.assertEqual(result["in_reply_to"], "<root@x>")
+        self.assertEqual(result["references"], "")
+        self.assertEqual(result["body_text"], "line one\nline two\n")
+        self.assertEqual(result["attachments"], [
+            {"filename": "report.pdf", "mime_type": "application/pdf", "size_bytes": 5}
+        ])
+
+    def test_headers_only_leaves_body_empty(self):
+        self.assertEqual(_parser_backend._parse_fast(b"raw", headers_only=True)["body_text"], "")
+
+
+class FastBackendFallbackTests(unittest.TestCase):
+
+    def _parse_with_failing_backend(self, error):
+        def parse_email(raw):
+            raise error
+
+        stderr = io.StringIO()
+        with mock.patch.object(_parser_backend, "fast_mail_parser", stub_module(parse_email)), \
+                mock.patch.object(_parser_backend, "USE_FAST_BACKEND", True), \
+                mock.patch.object(_parser_backend, "_fast_failure_warned", False), \
+                mock.patch.object(sys, "stderr", stderr):
+            results = [
+                _parser_backend.parse_bytes(b"Subject: hi\n\nbody\n") for _ in range(2)
+            ]
+        return results, stderr.getvalue()
+
+    def test_parse_error_falls_back_and_warns_once(self):
+        results, stderr = self._parse_with_failing_backend(StubParseError("bad mail"))
+
+        for result in results:
+            self.assertEqual(result["subject"], "hi")
+            self.assertEqual(result["body_text"], "body\n")
+        self.assertEqual(stderr.count("fast-mail-parser failed"), 1)
+
+    def test_programming_errors_are_not_swallowed(self):
+        with self.assertRaises(AttributeError):
+            self._parse_with_failing_backend(AttributeError("bug"))
+
+
+class EncodedSizeTests(unittest.TestCase):
+    """Attachment sizes computed from base64 text must equal the decoded size"""
+
+    def _part(self, data, newline):
+        encoded = base64.encodebytes(data).decode("ascii").replace("\n", newline)
+        raw = (
+            f"Content-Type: application/octet-stream{newline}"
+            f"Content-Transfer-Encoding: base64{newline}{newline}{encoded}"
+        ).encode("ascii")
+        return email.message_from_bytes(raw, policy=email.policy.default)
+
+    def test_base64_matches_decoded_length(self):
+        for newline in ("\n", "\r\n"):
+            # Every padding case (0, 1 and 2 '=') and multi-line payloads
+            for length in (0, 1, 2, 3, 57, 58, 59, 1000):
+                data = bytes(range(256)) * 4
+                part = self._part(data[:length], newline)
+                with self.subTest(newline=repr(newline), length=length):
+                    self.assertEqual(
+                        _parser_backend._encoded_size(part),
+                        len(part.get_payload(decode=True))
+                    )
+
+
+MULTIPART = b"""Message-Id: <m@x>
+Subject: report
+Content-Type: multipart/mixed; boundary="OUT"
+
+--OUT
+Content-Type: text/plain; charset=utf-8
+
+See attached.
+--OUT
+Content-Type: application/pdf; name="report.pdf"
+Content-Disposition: attachment; filename="report.pdf"
+Content-Transfer-Encoding: base64
+
+JVBERi0xLjQKJcfsj6IK
+--OUT--
+""".replace(b"\n", b"\r\n")
+
+
+class HeadersOnlyTests(unittest.TestCase):
+
+    def test_multipart_lists_attachments_without_body(self):
+        full = _parser_backend._parse_stdlib(MULTIPART)
+        headers = _parser_backend._parse_stdlib(MULTIPART, headers_only=True)
+
+        self.assertEqual(headers["body_text"], "")
+        self.assertEqual(headers["subject"], "report")
+        self.assertEqual(headers["attachments"], [
+            {"filename": "report.pdf", "mime_type": "application/pdf", "size_bytes": 15}
+        ])
+        self.assertEqual(headers["attachments"], full["attachments"])
+        self.assertEqual(full["body_text"].strip(), "See attached.")
+
+
+if __name__ == "__main__":
+    unittest.main()